@@ -0,0 +1,184 @@
+import math
+import threading
+import time
+import tracemalloc
+from collections import deque
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.template.base import Template
+
+
+"""
+Per-request performance samples for the /debug/perf/ panel.
+
+PerfMiddleware records, for every request, the view that handled it, the
+wall time, the SQL query count and total database time, the slowest
+queries, the time spent rendering templates and the peak Python memory
+allocated while it ran. Samples go into a ring buffer of the last
+PERF_SAMPLES requests, and the panel summarises them per view with
+p50/p95/p99. Everything is in-process: no debug toolbar, no network.
+
+Enabled with PERF_MONITOR = True. Memory is measured with tracemalloc,
+which is process-wide, so under a threaded server concurrent requests
+share one peak; query and template timings are per thread.
+"""
+
+
+SLOW_QUERY_COUNT = 5
+
+samples = deque(maxlen=getattr(settings, "PERF_SAMPLES", 500))
+samples_lock = threading.Lock()
+
+# template render time of the request running on this thread
+local = threading.local()
+
+
+def perf_enabled():
+    return getattr(settings, "PERF_MONITOR", False)
+
+
+def timed_template_render(render):
+    def render_and_time(self, context):
+        depth = getattr(local, "template_depth", None)
+        if depth is None:
+            return render(self, context)
+        # includes and extends render templates inside templates; only count the outermost
+        local.template_depth = depth + 1
+        start = time.perf_counter()
+        try:
+            return render(self, context)
+        finally:
+            local.template_depth = depth
+            if depth == 0:
+                local.template_seconds += time.perf_counter() - start
+
+    render_and_time.perf_wrapped = True
+    return render_and_time
+
+
+def install_template_timer():
+    if not getattr(Template.render, "perf_wrapped", False):
+        Template.render = timed_template_render(Template.render)
+
+
+class QueryRecorder:
+    """connection.execute_wrapper that counts and times every statement."""
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - start
+            self.count += 1
+            self.seconds += elapsed
+            self.queries.append((elapsed, sql))
+
+    def slowest(self, n=SLOW_QUERY_COUNT):
+        return [{'ms': round(elapsed * 1000, 3), 'sql': sql}
+                for elapsed, sql in sorted(self.queries, key=lambda query: query[0], reverse=True)[:n]]
+
+
+def view_name(request):
+    match = getattr(request, "resolver_match", None)
+    if match is None:
+        return request.path
+    func = getattr(match.func, "view_class", match.func)
+    return f"{func.__module__}.{func.__qualname__}"
+
+
+class PerfMiddleware:
+
+    def __init__(self, get_response):
+        if not perf_enabled():
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        install_template_timer()
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    def __call__(self, request):
+        recorder = QueryRecorder()
+        local.template_depth = 0
+        local.template_seconds = 0.0
+        tracemalloc.reset_peak()
+        memory_start = tracemalloc.get_traced_memory()[0]
+        start = time.perf_counter()
+
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(recorder))
+                response = self.get_response(request)
+        finally:
+            seconds = time.perf_counter() - start
+            template_seconds = local.template_seconds
+            local.template_depth = None
+
+        match = getattr(request, "resolver_match", None)
+        if match is None or match.url_name != "perfpanel":
+            record({
+                'view': view_name(request),
+                'path': request.path,
+                'method': request.method,
+                'status': response.status_code,
+                'ms': seconds * 1000,
+                'queries': recorder.count,
+                'db_ms': recorder.seconds * 1000,
+                'template_ms': template_seconds * 1000,
+                'peak_kb': max(tracemalloc.get_traced_memory()[1] - memory_start, 0) / 1024,
+                'slowest_queries': recorder.slowest(),
+                'time': time.time()
+            })
+        return response
+
+
+def record(sample):
+    with samples_lock:
+        samples.append(sample)
+
+
+def recent_samples():
+    with samples_lock:
+        return list(samples)
+
+
+def clear_samples():
+    with samples_lock:
+        samples.clear()
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a non-empty list."""
+    ordered = sorted(values)
+    return ordered[max(math.ceil(pct / 100 * len(ordered)) - 1, 0)]
+
+
+SUMMARY_FIELDS = ["ms", "queries", "db_ms", "template_ms", "peak_kb"]
+
+
+def summarize(recorded=None):
+    """{view: {'requests': n, field: {'p50', 'p95', 'p99', 'max'}, 'slowest_queries': [...]}}, busiest view first."""
+    by_view = {}
+    for sample in recent_samples() if recorded is None else recorded:
+        by_view.setdefault(sample['view'], []).append(sample)
+
+    summary = {}
+    for view, view_samples in sorted(by_view.items(), key=lambda item: -len(item[1])):
+        row = {'requests': len(view_samples)}
+        for field in SUMMARY_FIELDS:
+            values = [sample[field] for sample in view_samples]
+            row[field] = {'p50': percentile(values, 50), 'p95': percentile(values, 95),
+                          'p99': percentile(values, 99), 'max': max(values)}
+        slowest = [query for sample in view_samples for query in sample['slowest_queries']]
+        row['slowest_queries'] = sorted(slowest, key=lambda query: query['ms'], reverse=True)[:SLOW_QUERY_COUNT]
+        summary[view] = row
+    return summary
@@ -44,6 +44,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'CollegeManager.perf.PerfMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -124,6 +125,60 @@ STATICFILES_DIRS = [
     os.path.join(BASE_DIR, 'static')
 ]
 
+# Conflict reports are cached per semester until the data changes
+# (conflictreport.report_cache). The local-memory cache is per process; when
+# running several workers use a shared backend, e.g.
+# 'django.core.cache.backends.filebased.FileBasedCache' with a LOCATION directory.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'collegemanager',
+    }
+}
+
+CONFLICT_REPORT_CACHE_TIMEOUT = 60 * 60
+
+# Rarity weight for courses with no offering row or an offering code the
+# conflict report doesn't know (conflictreport.engine.RARITY_MAP)
+
+CONFLICT_RARITY_DEFAULT = 1
+
+# Conflict pairs shown per page of the report table
+
+CONFLICT_REPORT_PAGE_SIZE = 50
+
+# Students one section seats when estimating sections needed (conflictreport.demand)
+
+DEMAND_SECTION_SIZE = 30
+
+# Credits a student needs to graduate, the most they can take in one fall or
+# spring semester, and students per page of the risk report (studentplan.risk)
+
+GRADUATION_CREDITS = 120
+
+MAX_SEMESTER_CREDITS = 18
+
+RISK_REPORT_PAGE_SIZE = 100
+
+# Rows written per bulk_create batch by the CSV importer (uploaddata.importer)
+
+IMPORT_BATCH_SIZE = 500
+
+# Uploads are staged here and imported by a background thread (uploaddata.jobs)
+
+IMPORT_STAGING_DIR = BASE_DIR / 'import_staging'
+
+IMPORT_JOBS_ASYNC = True
+
+# Record query counts, DB/template time and peak memory per request and show
+# p50/p95/p99 per view at /debug/perf/ (CollegeManager.perf). Off by default;
+# PERF_SAMPLES is how many recent requests are kept.
+
+PERF_MONITOR = False
+
+PERF_SAMPLES = 500
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
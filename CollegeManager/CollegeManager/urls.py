@@ -27,5 +27,6 @@ urlpatterns = [
     #path('studentcourses/', include('studentcourses.urls')),
     #path('student/', include('student.urls')),
     #my bad pls forgive me
-    path('uploaddata/', include('uploaddata.urls'))
+    path('uploaddata/', include('uploaddata.urls')),
+    path('debug/perf/', views.perf_panel, name="perfpanel")
 ]
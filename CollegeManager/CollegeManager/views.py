@@ -1,6 +1,37 @@
-from django.http import HttpResponse
-from django.shortcuts import render
+from django.http import Http404, HttpResponse, JsonResponse
+from django.shortcuts import redirect, render
+
+from CollegeManager import perf
 
 
 def homepage(request):
     return render(request, "home.html")
+
+
+def perf_panel(request):
+    """Per-view latency and query summaries from PerfMiddleware; 404 unless PERF_MONITOR is on."""
+    if not perf.perf_enabled():
+        raise Http404("Performance monitoring is off (PERF_MONITOR).")
+
+    if request.method == "POST" and request.POST.get("action") == "clear":
+        perf.clear_samples()
+        return redirect("perfpanel")
+
+    recorded = perf.recent_samples()
+    summary = perf.summarize(recorded)
+    if request.GET.get("format") == "json":
+        return JsonResponse({'samples': len(recorded), 'views': summary})
+
+    views = [{
+        'view': view,
+        'requests': row['requests'],
+        'percentiles': [(pct, *(row[field][pct] for field in perf.SUMMARY_FIELDS))
+                        for pct in ("p50", "p95", "p99", "max")],
+        'slowest_queries': row['slowest_queries']
+    } for view, row in summary.items()]
+    context = {
+        'views': views,
+        'sample_count': len(recorded),
+        'sample_limit': perf.samples.maxlen
+    }
+    return render(request, "perf.html", context)
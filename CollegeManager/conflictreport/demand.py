@@ -0,0 +1,74 @@
+import math
+
+from django.conf import settings
+from django.db.models import Count, F
+
+from core.models import Course, Section, Enrollment, PastOrPlanned
+
+
+"""
+Per-course demand for a semester, computed in the database.
+
+A student counts once per course whether they are enrolled in it, planning
+it, or both, matching the incidence the conflict engine builds. Each count
+is a values('course').annotate(Count('student', distinct=True)) aggregate,
+so the cost in Python is one small dict per course no matter how many
+enrollment and plan rows the semester has:
+
+    students = enrolled + planned - (enrolled and planned)
+"""
+
+
+def default_section_size():
+    return getattr(settings, "DEMAND_SECTION_SIZE", 30)
+
+
+def count_by_course(queryset, course_field):
+    rows = (queryset
+            .values(course_field)
+            .annotate(students=Count("student", distinct=True))
+            .values_list(course_field, "students")
+            .order_by())
+    return dict(rows)
+
+
+def semester_course_demand(semester, section_size=None):
+    """
+    Return one dict per course with students, sections offered and the
+    sections needed to seat every student, most requested course first.
+    """
+    section_size = section_size or default_section_size()
+
+    enrolled = count_by_course(Enrollment.objects.filter(section__semester=semester), "section__course")
+    planned = count_by_course(PastOrPlanned.objects.filter(semester=semester), "course")
+    both = count_by_course(PastOrPlanned.objects.filter(semester=semester,
+                                                        student__enrollment__section__semester=semester,
+                                                        student__enrollment__section__course=F("course")),
+                           "course")
+    sections = dict(Section.objects
+                    .filter(semester=semester)
+                    .values("course")
+                    .annotate(sections=Count("pk"))
+                    .values_list("course", "sections")
+                    .order_by())
+
+    course_ids = enrolled.keys() | planned.keys() | sections.keys()
+    courses = {pk: (course_id, title)
+               for pk, course_id, title in Course.objects.filter(pk__in=course_ids)
+                                                         .values_list("pk", "course_id", "title")}
+
+    demand = []
+    for pk in course_ids:
+        students = enrolled.get(pk, 0) + planned.get(pk, 0) - both.get(pk, 0)
+        course_id, title = courses[pk]
+        demand.append({
+            'course_id': course_id,
+            'title': title,
+            'students': students,
+            'enrolled': enrolled.get(pk, 0),
+            'planned': planned.get(pk, 0),
+            'sections': sections.get(pk, 0),
+            'sections_needed': math.ceil(students / section_size)
+        })
+    demand.sort(key=lambda row: (-row['students'], row['course_id']))
+    return demand
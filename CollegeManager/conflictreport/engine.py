@@ -0,0 +1,296 @@
+import heapq
+from collections import defaultdict
+from itertools import chain, combinations_with_replacement
+from operator import itemgetter
+
+from django.conf import settings
+
+try:
+    import numpy as np
+except ImportError:  # scoring falls back to the pure Python pass
+    np = None
+
+from core.models import SEASON_ORDER, Course, Enrollment, PastOrPlanned, Offering, regular_term
+
+
+"""
+Conflict engine for the conflict report.
+
+Instead of comparing every pair of courses in a semester, the semester's
+(student, course) pairs are pulled from enrollments and plans and turned
+into a sparse student x course incidence (one course set per student). Walking each
+student's course set once yields the overlap for every pair that actually
+shares students, so the cost scales with real overlaps rather than C².
+
+When NumPy is installed the per-student arithmetic is batched: every
+student's graduation distance, weight and seniority bucket is computed
+once as an array, and the pair sums (overlap = AᵀA, grad weight =
+Aᵀ·diag(w)·A, one histogram column per bucket) are accumulated with
+bincount over the sparse co-enrollment pairs.
+"""
+
+
+LEVELS = ["Graduating Seniors", "Seniors", "Juniors", "Sophomores", "Freshmen"]
+
+# fall/spring terms until graduation -> seniority bucket
+LEVEL_MAP = {
+    0: "Graduating Seniors",
+    1: "Seniors",
+    2: "Juniors",
+    3: "Juniors",
+    4: "Sophomores",
+    5: "Sophomores",
+    6: "Freshmen",
+    7: "Freshmen"
+}
+LEVEL_INDEX = {distance: LEVELS.index(level) for distance, level in LEVEL_MAP.items()}
+
+# offering code -> course rarity weight
+RARITY_MAP = {'e': 1,
+              'ef': 1.4, 'es': 1.4,
+              'fo': 1.6, 'fe': 1.6,
+              'so': 1.6, 'se': 1.6}
+
+
+def semester_demand(semester, student_ids=None):
+    """
+    Build the student x course incidence for a semester from its Enrollment
+    rows (through Section) and its PastOrPlanned rows, deduplicated, with one
+    query each. Future semesters usually only have plans, past ones only
+    enrollments.
+
+    Returns (incidence, distances, demand):
+    incidence  {student pk: set of course pks}
+    distances  {student pk: semesters until graduation}
+    demand     {course pk: number of distinct students taking or planning it}
+    Pass student_ids to only load those students.
+    """
+    target = semester.ordinal
+    incidence = defaultdict(set)
+    distances = {}
+    demand = defaultdict(int)
+
+    enrolled = Enrollment.objects.filter(section__semester=semester)
+    planned = PastOrPlanned.objects.filter(semester=semester)
+    if student_ids is not None:
+        enrolled = enrolled.filter(student_id__in=student_ids)
+        planned = planned.filter(student_id__in=student_ids)
+
+    sources = (
+        enrolled.values_list("student_id", "section__course_id", "student__grad_ordinal"),
+        planned.values_list("student_id", "course_id", "student__grad_ordinal"),
+    )
+    for rows in sources:
+        for student_id, course_id, grad_ordinal in rows:
+            courses = incidence[student_id]
+            if course_id in courses:
+                continue
+            courses.add(course_id)
+            demand[course_id] += 1
+            if student_id not in distances:
+                distances[student_id] = grad_ordinal - target
+
+    return incidence, distances, demand
+
+
+def semester_incidence(semester, student_ids=None):
+    """(incidence, distances) from semester_demand."""
+    incidence, distances, _ = semester_demand(semester, student_ids)
+    return incidence, distances
+
+
+def student_grad_weight(grad_distance):
+    # graduating students weigh the same as students one semester out
+    if grad_distance == 0:
+        return 2
+    return 2 / grad_distance
+
+
+def grad_level(grad_distance, target):
+    """
+    LEVELS index for a student graduating grad_distance ordinals after the
+    target semester's ordinal, or None. Buckets count fall/spring terms, so
+    fa2026 -> sp2027 is one term like sp2026 -> fa2026.
+    """
+    return LEVEL_INDEX.get(regular_term(target + grad_distance) - regular_term(target))
+
+
+def pair_aggregates(incidence, distances, target):
+    """
+    Return one (course1 pk, course2 pk, overlap, grad weight sum, level counts)
+    row for every pair of courses sharing at least one student, with the lower
+    course pk first, sorted by pair. Level counts hold one student count per
+    entry of LEVELS. target is the semester's ordinal; distances are
+    graduation ordinal minus target, as semester_incidence returns them.
+
+    The diagonal of AᵀA comes along for free: the (course, course) row holds
+    the course's own demand and seniority mix. Scoring skips those rows.
+    """
+    pairs = {}
+    for student_id, courses in incidence.items():
+        if not courses:
+            continue
+
+        grad_distance = distances[student_id]
+        weight = student_grad_weight(grad_distance)
+        level = grad_level(grad_distance, target)
+
+        for pair in combinations_with_replacement(sorted(courses), 2):
+            stats = pairs.get(pair)
+            if stats is None:
+                stats = pairs[pair] = [0, 0.0, [0] * len(LEVELS)]
+            stats[0] += 1
+            stats[1] += weight
+            if level is not None:
+                stats[2][level] += 1
+
+    return [(course1_id, course2_id, *pairs[(course1_id, course2_id)])
+            for course1_id, course2_id in sorted(pairs)]
+
+
+def pair_aggregates_vectorized(incidence, distances, target):
+    """NumPy version of pair_aggregates; returns the same rows."""
+    students = [student_id for student_id, courses in incidence.items() if courses]
+    if not students:
+        return []
+
+    course_lists = [sorted(incidence[student_id]) for student_id in students]
+    sizes = np.fromiter((len(courses) for courses in course_lists), dtype=np.int64, count=len(students))
+    courses = np.fromiter(chain.from_iterable(course_lists), dtype=np.int64, count=int(sizes.sum()))
+    grad_distance = np.fromiter((distances[student_id] for student_id in students),
+                                dtype=np.int64, count=len(students))
+
+    # per-student weight and seniority bucket (len(LEVELS) = no bucket)
+    weights = np.divide(2.0, grad_distance, out=np.full(len(students), 2.0), where=grad_distance != 0)
+    level_keys = np.array(sorted(LEVEL_INDEX), dtype=np.int64)
+    key_levels = np.array([LEVEL_INDEX[key] for key in level_keys.tolist()], dtype=np.int64)
+    grad = grad_distance + target
+    terms = grad // 10 * 2 + (grad % 10 == SEASON_ORDER['fa']) - regular_term(target)
+    position = np.clip(np.searchsorted(level_keys, terms), 0, len(level_keys) - 1)
+    levels = np.where(level_keys[position] == terms, key_levels[position], len(LEVELS))
+
+    # every (left, right) entry pair within one student's sorted course list, left <= right
+    entry = np.arange(len(courses))
+    owner = np.repeat(np.arange(len(students)), sizes)
+    partners = np.repeat(np.cumsum(sizes), sizes) - entry
+    left = np.repeat(entry, partners)
+    offsets = np.repeat(np.cumsum(partners) - partners, partners)
+    right = left + np.arange(len(left)) - offsets
+    pair_student = owner[left]
+
+    # AᵀA, Aᵀ·diag(w)·A and one Aᵀ·diag(bucket)·A column per level, over the occupied pairs only
+    stride = int(courses.max()) + 1
+    pair_keys, inverse = np.unique(courses[left] * stride + courses[right], return_inverse=True)
+    overlap = np.bincount(inverse, minlength=len(pair_keys))
+    grad_weight = np.bincount(inverse, weights=weights[pair_student], minlength=len(pair_keys))
+    level_counts = np.bincount(inverse * (len(LEVELS) + 1) + levels[pair_student],
+                               minlength=len(pair_keys) * (len(LEVELS) + 1))
+    level_counts = level_counts.reshape(-1, len(LEVELS) + 1)[:, :len(LEVELS)]
+
+    course1_ids, course2_ids = np.divmod(pair_keys, stride)
+    return list(zip(course1_ids.tolist(), course2_ids.tolist(), overlap.tolist(),
+                    grad_weight.tolist(), level_counts.tolist()))
+
+
+def build_pair_aggregates(incidence, distances, target):
+    if np is None:
+        return pair_aggregates(incidence, distances, target)
+    return pair_aggregates_vectorized(incidence, distances, target)
+
+
+def conflict_reason(overlap, levels, overlap_rarity):
+    student_level_string = ", ".join(f"{count} {level}" for count, level in zip(levels, LEVELS))
+    infrequent = round(overlap_rarity - 1)
+
+    reason = f"{overlap} students overlap; {student_level_string}; {infrequent} infrequent courses"
+    if infrequent == 1:
+        reason = reason[:-1]
+    return reason
+
+
+def course_rarity_index(course_ids, default=None):
+    """
+    Return {course pk: rarity weight} for the given courses with one query,
+    using each course's first offering. Courses without an offering, or
+    whose offering code isn't in RARITY_MAP, get CONFLICT_RARITY_DEFAULT.
+    """
+    if default is None:
+        default = getattr(settings, "CONFLICT_RARITY_DEFAULT", 1)
+
+    codes = {}
+    for course_id, offering_code in (Offering.objects
+                                     .filter(course_id__in=course_ids)
+                                     .order_by("pk")
+                                     .values_list("course_id", "offering_code")):
+        codes.setdefault(course_id, offering_code.strip().lower())
+
+    return {course_id: RARITY_MAP.get(codes.get(course_id), default) for course_id in course_ids}
+
+
+def iter_scored_pairs(pair_rows, rarity, min_score=None, min_overlap=None):
+    """Yield (score, overlap rarity, row) for every pair row that clears the thresholds."""
+    for row in pair_rows:
+        course1_id, course2_id, overlap, grad_weight_sum, levels = row
+        if course1_id == course2_id:
+            continue
+        if min_overlap is not None and overlap < min_overlap:
+            continue
+        grad_weight = grad_weight_sum / overlap
+        if grad_weight <= 0:
+            continue
+
+        overlap_rarity = (rarity[course1_id] + rarity[course2_id]) / 2
+        score = overlap_rarity * grad_weight
+        if min_score is not None and score < min_score:
+            continue
+        yield score, overlap_rarity, row
+
+
+def score_pairs(pair_rows, rarity=None, top_k=None, min_score=None, min_overlap=None):
+    """
+    Turn pair aggregate rows into the report's course_conflicts list.
+
+    rarity is a course_rarity_index covering the pairs' courses; it is loaded
+    here when not given. min_overlap and min_score drop weak pairs, and top_k
+    keeps only the highest scoring pairs (highest first) with a heap, so the
+    full list is never sorted. Without top_k the pairs keep course pk order.
+    """
+    if rarity is None:
+        rarity = course_rarity_index({row[0] for row in pair_rows} | {row[1] for row in pair_rows})
+
+    scored = iter_scored_pairs(pair_rows, rarity, min_score, min_overlap)
+    if top_k is not None:
+        scored = heapq.nlargest(top_k, scored, key=itemgetter(0))
+    else:
+        scored = list(scored)
+
+    courses = Course.objects.in_bulk({course_id for _, _, row in scored for course_id in row[:2]})
+    return [{
+        'course1': courses[row[0]],
+        'course2': courses[row[1]],
+        'conflict_score': score,
+        'reason': conflict_reason(row[2], row[4], overlap_rarity)
+    } for score, overlap_rarity, row in scored]
+
+
+def course_demand(pair_rows):
+    """{course pk: (students, level counts)} from the diagonal rows of pair_aggregates."""
+    return {course1_id: (overlap, levels)
+            for course1_id, course2_id, overlap, _, levels in pair_rows if course1_id == course2_id}
+
+
+def demand_report(pair_rows):
+    """Estimated enrollment per course, most requested first, as dicts for the report page."""
+    demand = course_demand(pair_rows)
+    courses = Course.objects.in_bulk(demand)
+    ranked = sorted(demand.items(), key=lambda item: (-item[1][0], item[0]))
+    return [{
+        'course': courses[course_id],
+        'students': students,
+        'levels': dict(zip(LEVELS, levels))
+    } for course_id, (students, levels) in ranked]
+
+
+def conflict_report(semester):
+    incidence, distances = semester_incidence(semester)
+    return score_pairs(build_pair_aggregates(incidence, distances, semester.ordinal))
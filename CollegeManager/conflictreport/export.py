@@ -0,0 +1,62 @@
+import csv
+import heapq
+import json
+from operator import itemgetter
+
+from core.models import Course
+from conflictreport.engine import conflict_reason, course_rarity_index, iter_scored_pairs
+from conflictreport.matrix import iter_pair_rows, matrix_course_ids
+
+
+"""
+Streamed CSV and JSON exports of the conflict report.
+
+Rows are written as the stored pair rows are read and scored, so memory
+stays flat however many pairs a semester has and the response starts
+before scoring is done. Only the per-course lookups (rarity, course id
+and title) are loaded up front. With top_k the heap has to see every pair
+first, as on the page, but still holds only k of them.
+"""
+
+
+EXPORT_FIELDS = ["course1", "course1_title", "course2", "course2_title", "overlap", "conflict_score", "reason"]
+
+
+def conflict_export_rows(semester, top_k=None, min_score=None, min_overlap=None):
+    """Yield one flat dict per conflict, in the report page's order."""
+    course_ids = matrix_course_ids(semester)
+    rarity = course_rarity_index(course_ids)
+    courses = {pk: (course_id, title)
+               for pk, course_id, title in Course.objects.filter(pk__in=course_ids)
+                                                         .values_list("pk", "course_id", "title")}
+
+    scored = iter_scored_pairs(iter_pair_rows(semester), rarity, min_score, min_overlap)
+    if top_k is not None:
+        scored = heapq.nlargest(top_k, scored, key=itemgetter(0))
+
+    for score, overlap_rarity, (course1_id, course2_id, overlap, _, levels) in scored:
+        yield dict(zip(EXPORT_FIELDS, (*courses[course1_id], *courses[course2_id], overlap, score,
+                                       conflict_reason(overlap, levels, overlap_rarity))))
+
+
+class Echo:
+    """File-like object whose write returns the line, for csv.writer in a generator."""
+
+    def write(self, value):
+        return value
+
+
+def csv_lines(rows, fields=EXPORT_FIELDS):
+    writer = csv.DictWriter(Echo(), fieldnames=fields)
+    yield writer.writeheader()
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def json_chunks(semester, rows):
+    yield '{"semester": %s, "conflicts": [' % json.dumps(semester.semester_id)
+    separator = "\n"
+    for row in rows:
+        yield separator + json.dumps(row)
+        separator = ",\n"
+    yield "\n]}\n"
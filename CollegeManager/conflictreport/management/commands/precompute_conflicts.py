@@ -0,0 +1,91 @@
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.management.base import BaseCommand, CommandError
+
+from core.models import Semester
+from conflictreport.engine import build_pair_aggregates, semester_incidence
+from conflictreport.matrix import build_matrix, matrix_is_current, store_matrix
+from conflictreport.report_cache import semester_report
+
+
+def aggregate_semester(incidence, distances, target):
+    """build_pair_aggregates in a worker process, which never touches the database. Returns (pair rows, seconds)."""
+    start = time.perf_counter()
+    return build_pair_aggregates(incidence, distances, target), time.perf_counter() - start
+
+
+def build_in_workers(semesters, workers):
+    """
+    {semester pk: (pairs, seconds)} for the semesters, aggregated in worker
+    processes. This process reads each semester's incidence and writes its
+    matrix (one transaction per semester), so the workers need no database
+    connection and SQLite keeps a single writer.
+    """
+    results = {}
+    with ProcessPoolExecutor(max_workers=workers, initializer=django.setup) as pool:
+        pending = []
+        for semester in semesters:
+            start = time.perf_counter()
+            incidence, distances = semester_incidence(semester)
+            future = pool.submit(aggregate_semester, incidence, distances, semester.ordinal)
+            pending.append((semester, incidence, distances, future, time.perf_counter() - start))
+
+        for semester, incidence, distances, future, load_seconds in pending:
+            pair_rows, aggregate_seconds = future.result()
+            start = time.perf_counter()
+            store_matrix(semester, incidence, distances, pair_rows)
+            results[semester.pk] = (len(pair_rows), load_seconds + aggregate_seconds + time.perf_counter() - start)
+    return results
+
+
+class Command(BaseCommand):
+    help = ("Build the stored conflict matrix and, with a shared cache backend, warm the cached report "
+            "for every future semester (or the given ones), e.g. after the nightly registrar load.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--semester", action="append", dest="semesters", metavar="SEMESTER_ID",
+                            help="Only this semester (repeatable). Defaults to every future semester.")
+        parser.add_argument("--workers", type=int, default=0,
+                            help="Aggregate the semesters' pairs in this many worker processes.")
+        parser.add_argument("--rebuild", action="store_true",
+                            help="Rebuild matrices that are already current.")
+
+    def handle(self, *args, semesters, workers, rebuild, **options):
+        if semesters:
+            found = {semester.semester_id: semester for semester in Semester.objects.filter(semester_id__in=semesters)}
+            missing = [semester_id for semester_id in semesters if semester_id not in found]
+            if missing:
+                raise CommandError(f"Unknown semesters: {', '.join(missing)}")
+            semesters = [found[semester_id] for semester_id in semesters]
+        else:
+            semesters = list(Semester.objects.future())
+
+        total_start = time.perf_counter()
+        stale = [semester for semester in semesters if rebuild or not matrix_is_current(semester)]
+        if workers and stale:
+            results = build_in_workers(stale, workers)
+        else:
+            results = {}
+            for semester in stale:
+                start = time.perf_counter()
+                results[semester.pk] = (len(build_matrix(semester)), time.perf_counter() - start)
+
+        # a local-memory cache ends with this process, so warming it would only cost time
+        warm = not isinstance(caches["default"], LocMemCache)
+        for semester in semesters:
+            pairs, seconds = results.get(semester.pk, (None, 0.0))
+            if warm:
+                # the unfiltered report, as the page first shows it
+                semester_report(semester, {})
+            built = f"{pairs:>8} rows built" if pairs is not None else "     already current"
+            self.stdout.write(f"{semester.semester_id:<8} {built}  {seconds:.2f}s")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Precomputed {len(semesters)} semesters in {time.perf_counter() - total_start:.2f}s"))
+        if not warm:
+            self.stdout.write("Reports not cached: the local-memory cache is per process, so only a shared "
+                              "cache backend keeps them for the site.")
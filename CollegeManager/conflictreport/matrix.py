@@ -0,0 +1,201 @@
+from itertools import combinations_with_replacement
+
+from django.db import transaction
+from django.db.models import F
+
+from conflictreport.engine import LEVELS, build_pair_aggregates, grad_level, semester_incidence, student_grad_weight
+from conflictreport.models import ConflictMatrix, ConflictPair, ConflictMember
+
+
+"""
+Stored conflict matrix.
+
+The pair totals the engine produces for a semester are kept in ConflictPair
+so the report is a single indexed read. ConflictMember remembers what each
+student contributed, so when one student's enrollments or plans change only
+that student's pairs are updated: their old contribution is subtracted and
+the new one added, which costs O(k²) in the student's course count.
+
+A semester is built from scratch the first time it is read, again when
+MATRIX_VERSION changes (e.g. when the engine's inputs change), and after
+invalidate_matrices() for changes that shift many students at once.
+"""
+
+
+# 2: incidence includes PastOrPlanned rows and the demand diagonal
+# 3: seniority buckets count fall/spring terms until graduation
+MATRIX_VERSION = 3
+
+# ConflictPair columns holding the LEVELS histogram, in LEVELS order
+LEVEL_FIELDS = ["graduating_seniors", "seniors", "juniors", "sophomores", "freshmen"]
+
+
+def matrix_is_current(semester):
+    return ConflictMatrix.objects.filter(semester=semester, version=MATRIX_VERSION).exists()
+
+
+def build_matrix(semester):
+    """Recompute and store every pair and member row for the semester."""
+    incidence, distances = semester_incidence(semester)
+    pair_rows = build_pair_aggregates(incidence, distances, semester.ordinal)
+    return store_matrix(semester, incidence, distances, pair_rows)
+
+
+def store_matrix(semester, incidence, distances, pair_rows):
+    """Replace the semester's stored rows, in one transaction, with pair_rows computed from incidence."""
+    with transaction.atomic():
+        ConflictPair.objects.filter(semester=semester).delete()
+        ConflictMember.objects.filter(semester=semester).delete()
+
+        ConflictPair.objects.bulk_create(
+            ConflictPair(semester=semester, course1_id=course1_id, course2_id=course2_id,
+                         overlap=overlap, grad_weight=grad_weight, **dict(zip(LEVEL_FIELDS, levels)))
+            for course1_id, course2_id, overlap, grad_weight, levels in pair_rows
+        )
+        ConflictMember.objects.bulk_create(
+            ConflictMember(semester=semester, student_id=student_id,
+                           grad_distance=distances[student_id], courses=sorted(courses))
+            for student_id, courses in incidence.items()
+        )
+        ConflictMatrix.objects.update_or_create(semester=semester, defaults={'version': MATRIX_VERSION})
+
+    return pair_rows
+
+
+def invalidate_matrices(semester_ids):
+    """Drop the semesters' matrices so they are rebuilt from scratch on their next read."""
+    ConflictMatrix.objects.filter(semester_id__in=semester_ids).delete()
+
+
+def load_pair_rows(semester):
+    """Return the semester's pair rows in the engine's format, building the matrix if needed."""
+    if not matrix_is_current(semester):
+        return build_matrix(semester)
+
+    rows = (ConflictPair.objects
+            .filter(semester=semester)
+            .order_by("course1", "course2")
+            .values_list("course1_id", "course2_id", "overlap", "grad_weight", *LEVEL_FIELDS))
+    return [(course1_id, course2_id, overlap, grad_weight, list(levels))
+            for course1_id, course2_id, overlap, grad_weight, *levels in rows]
+
+
+def iter_pair_rows(semester, chunk_size=2000):
+    """load_pair_rows as a generator that reads stored rows in chunks instead of all at once."""
+    if not matrix_is_current(semester):
+        yield from build_matrix(semester)
+        return
+
+    rows = (ConflictPair.objects
+            .filter(semester=semester)
+            .order_by("course1", "course2")
+            .values_list("course1_id", "course2_id", "overlap", "grad_weight", *LEVEL_FIELDS))
+    for course1_id, course2_id, overlap, grad_weight, *levels in rows.iterator(chunk_size=chunk_size):
+        yield course1_id, course2_id, overlap, grad_weight, levels
+
+
+def matrix_course_ids(semester):
+    """Pks of every course in the semester's matrix, read from the demand diagonal."""
+    if not matrix_is_current(semester):
+        build_matrix(semester)
+    return list(ConflictPair.objects
+                .filter(semester=semester, course1=F("course2"))
+                .values_list("course1_id", flat=True))
+
+
+def add_contribution(deltas, courses, grad_distance, target, sign):
+    weight = sign * student_grad_weight(grad_distance)
+    level = grad_level(grad_distance, target)
+    for pair in combinations_with_replacement(sorted(courses), 2):
+        delta = deltas.get(pair)
+        if delta is None:
+            delta = deltas[pair] = [0, 0.0, [0] * len(LEVELS)]
+        delta[0] += sign
+        delta[1] += weight
+        if level is not None:
+            delta[2][level] += sign
+
+
+def refresh_students(semester_id, student_ids):
+    """
+    Bring the stored matrix up to date for the given students of one semester.
+    Does nothing if the semester's matrix hasn't been built yet.
+    """
+    matrix = (ConflictMatrix.objects
+              .select_related("semester")
+              .filter(semester_id=semester_id, version=MATRIX_VERSION)
+              .first())
+    if matrix is None:
+        return
+    semester = matrix.semester
+    student_ids = set(student_ids)
+
+    incidence, distances = semester_incidence(semester, student_ids)
+    members = {member.student_id: member
+               for member in ConflictMember.objects.filter(semester=semester, student_id__in=student_ids)}
+
+    deltas = {}
+    stale_members = []
+    new_members = []
+    for student_id in student_ids:
+        member = members.get(student_id)
+        courses = sorted(incidence.get(student_id, ()))
+        if member is not None:
+            if member.courses == courses and member.grad_distance == distances.get(student_id):
+                continue
+            add_contribution(deltas, member.courses, member.grad_distance, semester.ordinal, -1)
+            stale_members.append(member.pk)
+        if courses:
+            add_contribution(deltas, courses, distances[student_id], semester.ordinal, 1)
+            new_members.append(ConflictMember(semester=semester, student_id=student_id,
+                                              grad_distance=distances[student_id], courses=courses))
+
+    deltas = {pair: delta for pair, delta in deltas.items() if delta[0] or delta[1] or any(delta[2])}
+
+    with transaction.atomic():
+        if deltas:
+            apply_deltas(semester, deltas)
+        ConflictMember.objects.filter(pk__in=stale_members).delete()
+        ConflictMember.objects.bulk_create(new_members)
+        matrix.save(update_fields=["updated"])
+
+
+def refresh_changed_students(changed, chunk_size=500):
+    """refresh_students for {semester pk: student pks}, skipping semesters without a built matrix."""
+    built = ConflictMatrix.objects.filter(semester_id__in=changed, version=MATRIX_VERSION)
+    for semester_id in built.values_list("semester_id", flat=True):
+        student_ids = sorted(changed[semester_id])
+        for start in range(0, len(student_ids), chunk_size):
+            refresh_students(semester_id, student_ids[start:start + chunk_size])
+
+
+def apply_deltas(semester, deltas):
+    course_ids = {course_id for pair in deltas for course_id in pair}
+    existing = {(pair.course1_id, pair.course2_id): pair
+                for pair in ConflictPair.objects.filter(semester=semester,
+                                                        course1_id__in=course_ids,
+                                                        course2_id__in=course_ids)}
+
+    to_create, to_update, to_delete = [], [], []
+    for (course1_id, course2_id), (overlap, grad_weight, levels) in deltas.items():
+        pair = existing.get((course1_id, course2_id))
+        if pair is None:
+            pair = ConflictPair(semester=semester, course1_id=course1_id, course2_id=course2_id,
+                                overlap=0, grad_weight=0.0)
+
+        pair.overlap += overlap
+        pair.grad_weight += grad_weight
+        for field, count in zip(LEVEL_FIELDS, levels):
+            setattr(pair, field, getattr(pair, field) + count)
+
+        if pair.pk is None:
+            if pair.overlap > 0:
+                to_create.append(pair)
+        elif pair.overlap > 0:
+            to_update.append(pair)
+        else:
+            to_delete.append(pair.pk)
+
+    ConflictPair.objects.filter(pk__in=to_delete).delete()
+    ConflictPair.objects.bulk_update(to_update, ["overlap", "grad_weight", *LEVEL_FIELDS])
+    ConflictPair.objects.bulk_create(to_create)
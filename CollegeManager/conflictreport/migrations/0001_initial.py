@@ -0,0 +1,57 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:26
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('core', '0004_alter_student_options_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ConflictMatrix',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('version', models.IntegerField(default=0)),
+                ('updated', models.DateTimeField(auto_now=True)),
+                ('semester', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, to='core.semester')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ConflictMember',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('grad_distance', models.IntegerField()),
+                ('courses', models.JSONField(default=list)),
+                ('semester', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='core.semester')),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='core.student')),
+            ],
+            options={
+                'unique_together': {('semester', 'student')},
+            },
+        ),
+        migrations.CreateModel(
+            name='ConflictPair',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('overlap', models.IntegerField()),
+                ('grad_weight', models.FloatField()),
+                ('graduating_seniors', models.IntegerField(default=0)),
+                ('seniors', models.IntegerField(default=0)),
+                ('juniors', models.IntegerField(default=0)),
+                ('sophomores', models.IntegerField(default=0)),
+                ('freshmen', models.IntegerField(default=0)),
+                ('course1', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='core.course')),
+                ('course2', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='core.course')),
+                ('semester', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='core.semester')),
+            ],
+            options={
+                'unique_together': {('semester', 'course1', 'course2')},
+            },
+        ),
+    ]
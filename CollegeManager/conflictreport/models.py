@@ -1,3 +1,45 @@
 from django.db import models
+from core.models import Semester, Student, Course
 
-# Create your models here.
+
+class ConflictMatrix(models.Model):
+    """Marks a semester whose ConflictPair rows are built and kept up to date."""
+    semester = models.OneToOneField(Semester, on_delete=models.CASCADE)
+    version = models.IntegerField(default=0)
+    updated = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Conflict matrix for {self.semester} (v{self.version})"
+
+
+class ConflictPair(models.Model):
+    """
+    Overlap totals for one pair of courses sharing students in a semester (course1 has the lower pk).
+    A row with course1 == course2 holds that course's demand.
+    """
+    semester = models.ForeignKey(Semester, on_delete=models.CASCADE)
+    course1 = models.ForeignKey(Course, on_delete=models.CASCADE, related_name="+")
+    course2 = models.ForeignKey(Course, on_delete=models.CASCADE, related_name="+")
+    overlap = models.IntegerField()
+    grad_weight = models.FloatField()
+    graduating_seniors = models.IntegerField(default=0)
+    seniors = models.IntegerField(default=0)
+    juniors = models.IntegerField(default=0)
+    sophomores = models.IntegerField(default=0)
+    freshmen = models.IntegerField(default=0)
+    class Meta: unique_together = ("semester", "course1", "course2")
+
+    def __str__(self):
+        return f"{self.course1} / {self.course2} in {self.semester}: {self.overlap} students"
+
+
+class ConflictMember(models.Model):
+    """The course set and graduation distance a student currently contributes to a semester's matrix."""
+    semester = models.ForeignKey(Semester, on_delete=models.CASCADE)
+    student = models.ForeignKey(Student, on_delete=models.CASCADE)
+    grad_distance = models.IntegerField()
+    courses = models.JSONField(default=list)
+    class Meta: unique_together = ("semester", "student")
+
+    def __str__(self):
+        return f"{self.student} in {self.semester}: {len(self.courses)} courses"
@@ -0,0 +1,91 @@
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from conflictreport.engine import demand_report, score_pairs
+from conflictreport.matrix import load_pair_rows
+
+
+"""
+Cache for the conflict report page.
+
+Reports are stored per semester and filter set together with the dataset
+version they were computed from. The version is a counter in the cache
+that the signals and the bulk importer bump after every committed change
+to enrollments, plans, offerings, sections or students, so a stored report
+is only served while nothing it depends on has changed. The version and
+the report are read with a single get_many, so a repeated page load costs
+one cache round trip. Works with any backend that shares keys between the
+processes serving the site (file-based, memcached, redis); the local-memory
+default is per process.
+"""
+
+
+DATASET_VERSION_KEY = "conflictreport:dataset-version"
+
+# per-process hit/miss counts, see cache_stats()
+stats = Counter()
+
+
+def report_timeout():
+    return getattr(settings, "CONFLICT_REPORT_CACHE_TIMEOUT", 60 * 60)
+
+
+def bump_version(key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        # missing or evicted: restart from a value no earlier version can have used
+        cache.set(key, time.time_ns(), timeout=None)
+
+
+def bump_dataset_version():
+    bump_version(DATASET_VERSION_KEY)
+
+
+def dataset_changed():
+    """Bump the dataset version once the current transaction commits."""
+    transaction.on_commit(bump_dataset_version)
+
+
+def report_key(semester_id, filters):
+    parts = [f"{name}={filters[name]}" for name in sorted(filters) if filters[name] is not None]
+    return ":".join(["conflictreport:report", semester_id, *parts])
+
+
+def cached_report(semester_id, filters, compute):
+    """Return compute()'s result for the semester and filters, from the cache when the data hasn't changed."""
+    key = report_key(semester_id, filters)
+    found = cache.get_many([DATASET_VERSION_KEY, key])
+    version = found.get(DATASET_VERSION_KEY)
+    entry = found.get(key)
+
+    if version is not None and entry is not None and entry[0] == version:
+        stats['hits'] += 1
+        return entry[1]
+
+    stats['misses'] += 1
+    if version is None:
+        version = time.time_ns()
+        if not cache.add(DATASET_VERSION_KEY, version, timeout=None):
+            version = cache.get(DATASET_VERSION_KEY)
+    result = compute()
+    cache.set(key, (version, result), timeout=report_timeout())
+    return result
+
+
+def semester_report(semester, filters):
+    """(scored conflicts, course demand) for the report page, cached."""
+    def compute():
+        pair_rows = load_pair_rows(semester)
+        return score_pairs(pair_rows, **filters), demand_report(pair_rows)
+
+    return cached_report(semester.semester_id, filters, compute)
+
+
+def cache_stats():
+    hits, misses = stats['hits'], stats['misses']
+    return {'hits': hits, 'misses': misses, 'hit_rate': hits / (hits + misses) if hits + misses else 0.0}
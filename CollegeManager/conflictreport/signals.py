@@ -0,0 +1,126 @@
+import threading
+from contextlib import contextmanager
+
+from django.db.models.signals import post_save, post_delete, pre_delete, pre_save
+from django.dispatch import receiver
+
+from core.models import Semester, Student, Section, Enrollment, PastOrPlanned, Offering
+from conflictreport.matrix import invalidate_matrices, refresh_changed_students, refresh_students
+from conflictreport.models import ConflictMember
+from conflictreport.report_cache import dataset_changed
+
+
+"""
+Keeps the stored conflict matrices in step with single-row edits
+(upload_csv, the scheduler's add/remove actions, the admin), and expires
+cached reports whenever data they are built from changes.
+
+Code that changes many rows at once can run under refresh_deferred() and
+bring the matrix and cache up to date once afterwards, as the CSV importer
+does after bulk_create.
+"""
+
+
+DATASET_MODELS = [Enrollment, PastOrPlanned, Offering, Section, Student]
+
+local = threading.local()
+
+
+@contextmanager
+def refresh_deferred():
+    """Skip the per-row handlers on this thread; the caller refreshes the matrix and cache itself. Nests."""
+    previous = deferred()
+    local.deferred = True
+    try:
+        yield
+    finally:
+        local.deferred = previous
+
+
+def deferred():
+    return getattr(local, "deferred", False)
+
+
+def data_changed(sender, **kwargs):
+    if not deferred():
+        dataset_changed()
+
+
+for model in DATASET_MODELS:
+    post_save.connect(data_changed, sender=model, dispatch_uid=f"dataset-save-{model.__name__}")
+    post_delete.connect(data_changed, sender=model, dispatch_uid=f"dataset-delete-{model.__name__}")
+
+
+@receiver(post_save, sender=Enrollment)
+@receiver(post_delete, sender=Enrollment)
+def enrollment_changed(sender, instance, **kwargs):
+    if deferred():
+        return
+    refresh_students(instance.section.semester_id, [instance.student_id])
+
+
+@receiver(post_save, sender=PastOrPlanned)
+@receiver(post_delete, sender=PastOrPlanned)
+def planned_changed(sender, instance, **kwargs):
+    if deferred():
+        return
+    refresh_students(instance.semester_id, [instance.student_id])
+
+
+@receiver(pre_save, sender=Section)
+def section_saving(sender, instance, **kwargs):
+    if instance.pk is not None:
+        instance.previous_placement = (Section.objects
+                                       .filter(pk=instance.pk)
+                                       .values_list("course_id", "semester_id")
+                                       .first())
+
+
+@receiver(post_save, sender=Section)
+def section_changed(sender, instance, created, **kwargs):
+    # moving a section to another course or semester moves every enrolled student's course with it
+    previous = getattr(instance, "previous_placement", None)
+    instance.previous_placement = None
+    if created or deferred() or previous is None or previous == (instance.course_id, instance.semester_id):
+        return
+    student_ids = list(Enrollment.objects.filter(section=instance).values_list("student_id", flat=True))
+    if student_ids:
+        refresh_changed_students({semester_id: set(student_ids) for semester_id in {previous[1], instance.semester_id}})
+
+
+@receiver(post_save, sender=Student)
+def student_changed(sender, instance, created, **kwargs):
+    # a new expected graduation changes the student's weight in every semester they're in
+    if created or deferred():
+        return
+    semester_ids = ConflictMember.objects.filter(student=instance).values_list("semester_id", flat=True)
+    for semester_id in semester_ids:
+        refresh_students(semester_id, [instance.pk])
+
+
+@receiver(pre_delete, sender=Student)
+def student_deleted(sender, instance, **kwargs):
+    # ConflictMember rows go in the cascade before the enrollment and plan handlers run, so the
+    # student's pairs would never be subtracted; take their rows out first while the members exist
+    semester_ids = list(ConflictMember.objects.filter(student=instance).values_list("semester_id", flat=True))
+    with refresh_deferred():
+        Enrollment.objects.filter(student=instance).delete()
+        PastOrPlanned.objects.filter(student=instance).delete()
+    refresh_changed_students({semester_id: {instance.pk} for semester_id in semester_ids})
+
+
+@receiver(pre_save, sender=Semester)
+def semester_renamed(sender, instance, **kwargs):
+    # Semester.save moves grad_ordinal with a queryset update, which skips student_changed; a new
+    # ordinal shifts the graduation distance of everyone in the semester's own matrix and of its
+    # graduates in every other matrix, so those are rebuilt rather than patched
+    if instance.pk is None:
+        return
+    old_ordinal = Semester.objects.filter(pk=instance.pk).values_list("ordinal", flat=True).first()
+    if old_ordinal is None or old_ordinal == instance.ordinal:
+        return
+    semester_ids = {instance.pk, *ConflictMember.objects
+                                   .filter(student__expected_graduation=instance)
+                                   .values_list("semester_id", flat=True)}
+    invalidate_matrices(semester_ids)
+    dataset_changed()
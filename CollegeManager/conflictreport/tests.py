@@ -1,3 +1,506 @@
-from django.test import TestCase
+import csv
+import json
+import os
+import random
+import tempfile
+import time
+from io import StringIO
+from unittest import skipIf, skipUnless
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from core.models import Semester, Department, Student, Course, Section, Enrollment, PastOrPlanned, Offering
+from conflictreport import engine
+from django.urls import reverse
+
+from conflictreport.engine import (build_pair_aggregates, conflict_report, course_demand, pair_aggregates,
+                                   score_pairs, semester_demand, semester_incidence)
+from conflictreport.demand import semester_course_demand
+from conflictreport.matrix import load_pair_rows
+from conflictreport import report_cache, signals
+from conflictreport.models import ConflictMatrix, ConflictMember, ConflictPair
+from conflictreport.util_functions import semester_to_number
+from uploaddata.importer import import_rows
+
+
+def reference_conflict_report(semester):
+    """
+    The per-pair loop from the original conflict_report_home, kept as the
+    parity reference with two corrections: a graduating student adds 2 to
+    the grad weight (the original assigned it, dropping everyone counted
+    before them), and the seniority bucket comes from engine.grad_level.
+    """
+    course_list = list(Course.objects.filter(section__semester=semester).distinct().order_by("pk"))
+    conflict_scores = []
+    for i in range(len(course_list)):
+        for j in range(i + 1, len(course_list)):
+            course1, course2 = course_list[i], course_list[j]
+            students1_ids = set(Enrollment.objects.filter(section__course=course1, section__semester=semester)
+                                .values_list('student__student_id', flat=True))
+            students2_ids = set(Enrollment.objects.filter(section__course=course2, section__semester=semester)
+                                .values_list('student__student_id', flat=True))
+            overlapping_students = Student.objects.filter(student_id__in=list(students1_ids & students2_ids))
+
+            grad_weight = 0
+            overlap_rarity = 0
+            student_levels = [0] * len(engine.LEVELS)
+            for student in overlapping_students:
+                grad_distance = (semester_to_number(student.expected_graduation.semester_id) -
+                                 semester_to_number(semester.semester_id))
+                student_levels[engine.grad_level(grad_distance, semester.ordinal)] += 1
+                grad_weight += 2 / grad_distance if grad_distance != 0 else 2
+
+            if len(overlapping_students) > 0:
+                grad_weight /= len(overlapping_students)
+                offering1 = Offering.objects.filter(course=course1).first().offering_code
+                offering2 = Offering.objects.filter(course=course2).first().offering_code
+                overlap_rarity = (engine.RARITY_MAP.get(offering1) + engine.RARITY_MAP.get(offering2)) / 2
+
+            if grad_weight > 0:
+                conflict_scores.append({
+                    'course1': course1,
+                    'course2': course2,
+                    'conflict_score': overlap_rarity * grad_weight,
+                    'reason': engine.conflict_reason(len(overlapping_students), student_levels, overlap_rarity)
+                })
+    return conflict_scores
+
+
+def synthetic_incidence(student_count, course_count, seed=0):
+    rng = random.Random(seed)
+    incidence, distances = {}, {}
+    for student_id in range(student_count):
+        incidence[student_id] = set(rng.sample(range(1, course_count + 1), rng.randint(1, 6)))
+        # graduation ordinal minus a target's: every season pairing up to four years out, and a few outliers
+        distances[student_id] = rng.choice([*range(-2, 33), -10, 40])
+    return incidence, distances
+
+
+class ConflictDataMixin:
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.spring = Semester.objects.create(semester_id="sp2026")
+        fall = Semester.objects.create(semester_id="fa2026")
+        later = Semester.objects.create(semester_id="sp2027")
+        dept = Department.objects.create(department_id="CS")
+
+        cls.courses = []
+        for num, code in ((101, 'e'), (235, 'fe'), (356, 'fo')):
+            course = Course.objects.create(course_id=f"C{num}", department=dept, course_num=num,
+                                           title=f"Course {num}", min_hours=3, max_hours=3)
+            Offering.objects.create(course=course, offering_code=code)
+            Section.objects.create(section_id=f"S{num}", department=dept, course=course,
+                                   section_num=1, semester=cls.spring)
+            cls.courses.append(course)
+
+        # (student id, graduation semester, courses taken in sp2026)
+        roster = (("S001", cls.spring, (0, 1, 2)),
+                  ("S002", fall, (0, 1)),
+                  ("S003", later, (1, 2)),
+                  ("S004", later, (0,)))
+        for student_id, grad, taken in roster:
+            student = Student.objects.create(student_id=student_id, name=student_id,
+                                             email=f"{student_id}@college.edu", expected_graduation=grad)
+            for index in taken:
+                Enrollment.objects.create(student=student,
+                                          section=Section.objects.get(course=cls.courses[index]))
+
+    def setUp(self):
+        # on_commit never fires inside TestCase, so nothing bumps the dataset version between tests
+        cache.clear()
+
+
+class ConflictEngineTests(ConflictDataMixin, TestCase):
+
+    def test_only_overlapping_pairs_are_scored(self):
+        conflicts = conflict_report(self.spring)
+        pairs = [(c['course1'].course_num, c['course2'].course_num) for c in conflicts]
+        self.assertEqual(pairs, [(101, 235), (101, 356), (235, 356)])
+
+    def test_scores_and_reasons(self):
+        conflicts = {(c['course1'].course_num, c['course2'].course_num): c
+                     for c in conflict_report(self.spring)}
+
+        # S001 graduates this semester (weight 2), S002 is two semesters out (weight 1)
+        first = conflicts[(101, 235)]
+        self.assertAlmostEqual(first['conflict_score'], 1.3 * (2 + 1) / 2)
+        self.assertEqual(first['reason'], "2 students overlap; 1 Graduating Seniors, 1 Seniors, "
+                                          "0 Juniors, 0 Sophomores, 0 Freshmen; 0 infrequent courses")
+
+        # S001 and S003 (ten semester-steps out, weight 0.2)
+        last = conflicts[(235, 356)]
+        self.assertAlmostEqual(last['conflict_score'], 1.6 * (2 + 0.2) / 2)
+        self.assertEqual(last['reason'], "2 students overlap; 1 Graduating Seniors, 0 Seniors, "
+                                         "1 Juniors, 0 Sophomores, 0 Freshmen; 1 infrequent course")
+
+    def test_query_count_does_not_depend_on_course_count(self):
+        # enrollments, plans, offerings, courses
+        with self.assertNumQueries(4):
+            conflict_report(self.spring)
+
+    def test_unknown_or_missing_offerings_use_default_rarity(self):
+        Offering.objects.filter(course=self.courses[1]).update(offering_code="sp")
+        Offering.objects.filter(course=self.courses[2]).delete()
+
+        with override_settings(CONFLICT_RARITY_DEFAULT=1.2):
+            rarity = engine.course_rarity_index([course.pk for course in self.courses])
+            conflicts = {(c['course1'].course_num, c['course2'].course_num): c
+                         for c in conflict_report(self.spring)}
+
+        self.assertEqual(rarity, {self.courses[0].pk: 1, self.courses[1].pk: 1.2, self.courses[2].pk: 1.2})
+        self.assertAlmostEqual(conflicts[(235, 356)]['conflict_score'], 1.2 * (2 + 0.2) / 2)
+
+    def test_top_k_and_thresholds(self):
+        pair_rows = build_pair_aggregates(*semester_incidence(self.spring), self.spring.ordinal)
+        everything = score_pairs(pair_rows)
+
+        top = score_pairs(pair_rows, top_k=2)
+        expected = sorted(everything, key=lambda c: c['conflict_score'], reverse=True)[:2]
+        self.assertEqual([c['conflict_score'] for c in top], [c['conflict_score'] for c in expected])
+
+        self.assertEqual(score_pairs(pair_rows, min_overlap=3), [])
+        self.assertTrue(all(c['conflict_score'] >= 1.8 for c in score_pairs(pair_rows, min_score=1.8)))
+        self.assertLess(len(score_pairs(pair_rows, min_score=1.8)), len(everything))
+
+    @override_settings(CONFLICT_REPORT_PAGE_SIZE=2)
+    def test_report_page_is_paginated(self):
+        response = self.client.get(reverse("conflictreportparams"), {"semester": "sp2026", "page": 2})
+        self.assertEqual(len(response.context['course_conflicts']), 1)
+        self.assertEqual(response.context['conflict_count'], 3)
+        self.assertContains(response, "Page 2 of 2")
+
+        response = self.client.post(reverse("conflictreportparams"), {"semester": "sp2026", "top_k": "1"})
+        self.assertEqual(response.context['conflict_count'], 1)
+        self.assertEqual(response.context['page_query'], "top_k=1&semester=sp2026")
+
+    def test_future_semester_uses_planned_courses(self):
+        fall = Semester.objects.get(semester_id="fa2026")
+        for student in Student.objects.filter(student_id__in=["S002", "S003", "S004"]):
+            for course in self.courses[1:]:
+                PastOrPlanned.objects.create(student=student, semester=fall, course=course)
+
+        incidence, distances, demand = semester_demand(fall)
+        self.assertEqual(len(incidence), 3)
+        self.assertEqual(demand, {self.courses[1].pk: 3, self.courses[2].pk: 3})
+
+        conflicts = conflict_report(fall)
+        self.assertEqual([(c['course1'], c['course2']) for c in conflicts], [(self.courses[1], self.courses[2])])
+        self.assertTrue(conflicts[0]['reason'].startswith("3 students overlap"))
+
+    def test_fall_target_buckets_every_student(self):
+        # S002 graduates this fall; S003 and S004 the spring after, one fall/spring term out
+        fall = Semester.objects.get(semester_id="fa2026")
+        for student in Student.objects.filter(student_id__in=["S002", "S003", "S004"]):
+            for course in self.courses[1:]:
+                PastOrPlanned.objects.create(student=student, semester=fall, course=course)
+
+        for course1_id, course2_id, overlap, _, levels in build_pair_aggregates(*semester_incidence(fall),
+                                                                                fall.ordinal):
+            self.assertEqual(sum(levels), overlap)
+            self.assertEqual(levels, [1, 2, 0, 0, 0])
+        self.assertEqual(conflict_report(fall)[0]['reason'], "3 students overlap; 1 Graduating Seniors, 2 Seniors, "
+                                                            "0 Juniors, 0 Sophomores, 0 Freshmen; 1 infrequent course")
+
+    def test_report_page_lists_course_demand(self):
+        response = self.client.get(reverse("conflictreportparams"), {"semester": "sp2026"})
+        demand = [(row['course'].course_num, row['students']) for row in response.context['course_demand']]
+        self.assertEqual(demand, [(101, 3), (235, 3), (356, 2)])
+        self.assertContains(response, "Estimated demand")
+
+    def test_matches_reference_loop(self):
+        expected = reference_conflict_report(self.spring)
+        actual = conflict_report(self.spring)
+
+        self.assertEqual(len(actual), len(expected))
+        for old, new in zip(expected, actual):
+            self.assertEqual((new['course1'], new['course2']), (old['course1'], old['course2']))
+            self.assertAlmostEqual(new['conflict_score'], old['conflict_score'])
+            self.assertEqual(new['reason'], old['reason'])
+
+
+class CourseDemandTests(ConflictDataMixin, TestCase):
+
+    def test_students_are_counted_once_per_course(self):
+        student = Student.objects.get(student_id="S004")
+        PastOrPlanned.objects.create(student=student, semester=self.spring, course=self.courses[0])
+        PastOrPlanned.objects.create(student=student, semester=self.spring, course=self.courses[2])
+
+        demand = {row['course_id']: row for row in semester_course_demand(self.spring, section_size=2)}
+        self.assertEqual(demand['C101'], {'course_id': 'C101', 'title': 'Course 101', 'students': 3,
+                                          'enrolled': 3, 'planned': 1, 'sections': 1, 'sections_needed': 2})
+        self.assertEqual(demand['C356']['students'], 3)
+
+        # the same counts as the conflict engine's demand diagonal
+        _, _, engine_demand = semester_demand(self.spring)
+        self.assertEqual({row['course_id']: row['students'] for row in demand.values()},
+                         {course.course_id: engine_demand[course.pk] for course in self.courses})
+
+    def test_query_count_does_not_depend_on_rows(self):
+        # enrolled, planned, both, sections, courses
+        with self.assertNumQueries(5):
+            semester_course_demand(self.spring)
+
+    def test_html_and_json(self):
+        response = self.client.get(reverse("conflictdemand"), {"semester": "sp2026"})
+        self.assertContains(response, "Course demand for Spring 2026")
+
+        data = self.client.get(reverse("conflictdemand"), {"semester": "sp2026", "format": "json"}).json()
+        self.assertEqual(data['semester'], "sp2026")
+        self.assertEqual([row['course_id'] for row in data['courses']], ["C101", "C235", "C356"])
+
+
+class ReportCacheTests(ConflictDataMixin, TestCase):
+
+    def load_report(self):
+        return self.client.get(reverse("conflictreportparams"), {"semester": "sp2026"})
+
+    def test_repeated_loads_are_one_cache_get(self):
+        self.load_report()
+        hits = report_cache.stats['hits']
+
+        calls = []
+        get_many = cache.get_many
+        def counting_get_many(*args, **kwargs):
+            calls.append(args)
+            return get_many(*args, **kwargs)
+
+        cache.get_many = counting_get_many
+        try:
+            # semester list and selected semester only; the report itself comes from the cache
+            with self.assertNumQueries(2):
+                response = self.load_report()
+        finally:
+            del cache.get_many
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(report_cache.stats['hits'], hits + 1)
+        self.assertEqual(response.context['conflict_count'], 3)
+
+    def test_committed_changes_expire_the_report(self):
+        self.assertEqual(self.load_report().context['conflict_count'], 3)
+        student = Student.objects.get(student_id="S004")
+        fall = Semester.objects.get(semester_id="fa2026")
+
+        # changes to data the report doesn't read still bump the version
+        with self.captureOnCommitCallbacks(execute=True):
+            PastOrPlanned.objects.create(student=student, semester=fall, course=self.courses[2])
+        misses = report_cache.stats['misses']
+        self.load_report()
+        self.assertEqual(report_cache.stats['misses'], misses + 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Enrollment.objects.filter(student__student_id="S001").delete()
+        self.assertEqual(self.load_report().context['conflict_count'], 2)
+
+    def test_bulk_import_bumps_the_version(self):
+        self.load_report()
+        version = cache.get(report_cache.DATASET_VERSION_KEY)
+        with self.captureOnCommitCallbacks(execute=True):
+            import_rows("enrollment", [{'std id': 'S004', 'sec id': 'S356'}])
+        self.assertEqual(cache.get(report_cache.DATASET_VERSION_KEY), version + 1)
+
+    def test_file_based_backend(self):
+        with override_settings(CACHES={'default': {
+                'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+                'LOCATION': tempfile.mkdtemp()}}):
+            self.load_report()
+            hits = report_cache.stats['hits']
+            self.load_report()
+            self.assertEqual(report_cache.stats['hits'], hits + 1)
+
+            report_cache.bump_dataset_version()
+            self.load_report()
+            self.assertEqual(report_cache.stats['hits'], hits + 1)
+
+
+class ExportTests(ConflictDataMixin, TestCase):
+
+    def test_csv_streams_the_report_rows(self):
+        response = self.client.get(reverse("conflictexportcsv"), {"semester": "sp2026"})
+        self.assertTrue(response.streaming)
+
+        # the header goes out before anything is read from the database
+        chunks = iter(response.streaming_content)
+        with self.assertNumQueries(0):
+            header = next(chunks)
+        self.assertEqual(header, b"course1,course1_title,course2,course2_title,overlap,conflict_score,reason\r\n")
+
+        rows = list(csv.DictReader(b"".join([header, *chunks]).decode().splitlines()))
+        expected = conflict_report(self.spring)
+        self.assertEqual([(row['course1'], row['course2']) for row in rows],
+                         [(c['course1'].course_id, c['course2'].course_id) for c in expected])
+        self.assertEqual([row['reason'] for row in rows], [c['reason'] for c in expected])
+
+    def test_json_takes_the_page_filters(self):
+        response = self.client.get(reverse("conflictexportjson"), {"semester": "sp2026", "top_k": "1"})
+        data = json.loads(b"".join(response.streaming_content))
+        self.assertEqual(data['semester'], "sp2026")
+
+        top = score_pairs(load_pair_rows(self.spring), top_k=1)[0]
+        self.assertEqual(len(data['conflicts']), 1)
+        self.assertEqual(data['conflicts'][0]['course1'], top['course1'].course_id)
+        self.assertAlmostEqual(data['conflicts'][0]['conflict_score'], top['conflict_score'])
+
+        response = self.client.get(reverse("conflictexportjson"), {"semester": "sp2026", "min_overlap": "3"})
+        self.assertEqual(json.loads(b"".join(response.streaming_content))['conflicts'], [])
+
+
+class PrecomputeConflictsTests(ConflictDataMixin, TestCase):
+
+    @override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+                                           'LOCATION': tempfile.mkdtemp()}})
+    def test_builds_matrices_and_warms_the_report(self):
+        cache.clear()
+        out = StringIO()
+        call_command("precompute_conflicts", semester=["sp2026", "sp2027"], stdout=out)
+        self.assertEqual(set(ConflictMatrix.objects.values_list("semester__semester_id", flat=True)),
+                         {"sp2026", "sp2027"})
+        self.assertRegex(out.getvalue(), r"sp2026\s+6 rows built")
+
+        misses = report_cache.stats['misses']
+        with self.assertNumQueries(2):
+            self.client.get(reverse("conflictreportparams"), {"semester": "sp2026"})
+        self.assertEqual(report_cache.stats['misses'], misses)
+
+        call_command("precompute_conflicts", semester=["sp2026"], stdout=out)
+        self.assertIn("already current", out.getvalue())
+
+    def test_local_memory_cache_is_not_warmed(self):
+        out = StringIO()
+        call_command("precompute_conflicts", semester=["sp2026"], stdout=out)
+        self.assertIn("Reports not cached", out.getvalue())
+
+        misses = report_cache.stats['misses']
+        self.client.get(reverse("conflictreportparams"), {"semester": "sp2026"})
+        self.assertEqual(report_cache.stats['misses'], misses + 1)
+
+    def test_workers_build_the_same_matrices(self):
+        out = StringIO()
+        call_command("precompute_conflicts", semester=["sp2026", "sp2027"], workers=2, stdout=out)
+        self.assertRegex(out.getvalue(), r"sp2026\s+6 rows built")
+        self.assertEqual(set(ConflictMatrix.objects.values_list("semester__semester_id", flat=True)),
+                         {"sp2026", "sp2027"})
+        stored = load_pair_rows(self.spring)
+        self.assertEqual(stored, build_pair_aggregates(*semester_incidence(self.spring), self.spring.ordinal))
+        self.assertEqual(ConflictMember.objects.filter(semester=self.spring).count(), 4)
+
+    def test_defaults_to_future_semesters(self):
+        call_command("precompute_conflicts", stdout=StringIO())
+        self.assertEqual(set(ConflictMatrix.objects.values_list("semester", flat=True)),
+                         set(Semester.objects.future().values_list("pk", flat=True)))
+
+    def test_unknown_semester(self):
+        with self.assertRaisesMessage(CommandError, "fa1999"):
+            call_command("precompute_conflicts", semester=["fa1999"], stdout=StringIO())
+
+
+class StoredMatrixTests(ConflictDataMixin, TestCase):
+
+    def assertMatchesFresh(self):
+        stored = load_pair_rows(self.spring)
+        fresh = build_pair_aggregates(*semester_incidence(self.spring), self.spring.ordinal)
+        self.assertEqual([row[:3] + (row[4],) for row in stored], [row[:3] + (row[4],) for row in fresh])
+        for stored_row, fresh_row in zip(stored, fresh):
+            self.assertAlmostEqual(stored_row[3], fresh_row[3])
+
+    def test_reads_stored_rows_once_built(self):
+        load_pair_rows(self.spring)
+        with self.assertNumQueries(2):
+            load_pair_rows(self.spring)
+
+    def test_enrollment_changes_update_only_that_student(self):
+        load_pair_rows(self.spring)
+        student = Student.objects.get(student_id="S004")
+
+        Enrollment.objects.create(student=student, section=Section.objects.get(course=self.courses[2]))
+        self.assertMatchesFresh()
+
+        Enrollment.objects.filter(student__student_id="S001").delete()
+        self.assertMatchesFresh()
+        self.assertFalse(ConflictPair.objects.filter(overlap__lte=0).exists())
+
+    def test_deleting_a_student_removes_their_pairs(self):
+        load_pair_rows(self.spring)
+        Student.objects.get(student_id="S001").delete()
+        self.assertMatchesFresh()
+        self.assertFalse(ConflictMember.objects.filter(student__student_id="S001").exists())
+
+    def test_moving_a_section_moves_its_students(self):
+        fall = Semester.objects.get(semester_id="fa2026")
+        load_pair_rows(self.spring)
+        load_pair_rows(fall)
+
+        section = Section.objects.get(section_id="S235")
+        section.course = Course.objects.create(course_id="C999", department=section.department, course_num=999,
+                                               title="Course 999", min_hours=3, max_hours=3)
+        section.save()
+        self.assertMatchesFresh()
+
+        section.semester = fall
+        section.save()
+        self.assertMatchesFresh()
+        self.assertEqual(load_pair_rows(fall), build_pair_aggregates(*semester_incidence(fall), fall.ordinal))
+
+    def test_deferred_refreshes_nest(self):
+        with signals.refresh_deferred():
+            with signals.refresh_deferred():
+                self.assertTrue(signals.deferred())
+            self.assertTrue(signals.deferred())
+        self.assertFalse(signals.deferred())
+
+    def test_graduation_change_reweights_pairs(self):
+        load_pair_rows(self.spring)
+        student = Student.objects.get(student_id="S003")
+        student.expected_graduation = self.spring
+        student.save()
+        self.assertMatchesFresh()
+
+    def test_planned_rows_refresh_pairs_and_demand(self):
+        load_pair_rows(self.spring)
+        student = Student.objects.get(student_id="S004")
+        PastOrPlanned.objects.create(student=student, semester=self.spring, course=self.courses[1])
+        self.assertMatchesFresh()
+        self.assertEqual(course_demand(load_pair_rows(self.spring))[self.courses[1].pk][0], 4)
+
+        # planning a course the student is already enrolled in is not counted twice
+        PastOrPlanned.objects.create(student=student, semester=self.spring, course=self.courses[0])
+        self.assertMatchesFresh()
+        self.assertEqual(course_demand(load_pair_rows(self.spring))[self.courses[0].pk][0], 3)
+
+
+@skipIf(engine.np is None, "NumPy is not installed")
+class VectorizedScoringTests(SimpleTestCase):
+
+    def test_matches_python_pass(self):
+        incidence, distances = synthetic_incidence(2000, 60)
+        for target in (20260, 20261, 20262):
+            expected = pair_aggregates(incidence, distances, target)
+            actual = engine.pair_aggregates_vectorized(incidence, distances, target)
+
+            self.assertEqual(len(actual), len(expected))
+            for new, old in zip(actual, expected):
+                self.assertEqual(new[:3], old[:3])
+                self.assertAlmostEqual(new[3], old[3])
+                self.assertEqual(new[4], old[4])
+
+    def test_students_with_one_course_only_add_demand(self):
+        self.assertEqual(engine.pair_aggregates_vectorized({1: {5}}, {1: 0}, 20260), [(5, 5, 1, 2.0, [1, 0, 0, 0, 0])])
+        self.assertEqual(engine.pair_aggregates_vectorized({1: set()}, {1: 0}, 20260), [])
+
+    @skipUnless(os.environ.get("RUN_BENCHMARKS"), "set RUN_BENCHMARKS=1 to run benchmarks")
+    def test_benchmark_10k_students_500_courses(self):
+        # best of three runs each; the batched pass has to beat the per-student one
+        incidence, distances = synthetic_incidence(10000, 500)
+        seconds, sizes = {}, {}
+        for aggregate in (pair_aggregates, engine.pair_aggregates_vectorized):
+            runs = []
+            for _ in range(3):
+                start = time.perf_counter()
+                sizes[aggregate] = len(aggregate(incidence, distances, 20260))
+                runs.append(time.perf_counter() - start)
+            seconds[aggregate] = min(runs)
+
+        self.assertEqual(sizes[pair_aggregates], sizes[engine.pair_aggregates_vectorized])
+        self.assertLess(seconds[engine.pair_aggregates_vectorized], seconds[pair_aggregates])
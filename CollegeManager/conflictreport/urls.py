@@ -3,5 +3,8 @@ from . import views
 
 urlpatterns = [
     path('', views.conflict_report_home, name="conflictreport"),
-    path('report/', views.conflict_report_home, name="conflictreportparams")
+    path('report/', views.conflict_report_home, name="conflictreportparams"),
+    path('demand/', views.course_demand_page, name="conflictdemand"),
+    path('export.csv', views.export_csv, name="conflictexportcsv"),
+    path('export.json', views.export_json, name="conflictexportjson")
 ]
\ No newline at end of file
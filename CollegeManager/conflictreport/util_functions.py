@@ -1,5 +1,7 @@
 import datetime
 
+from core.models import semester_ordinal
+
 
 def get_current_semester():
     today = datetime.date.today()
@@ -32,5 +34,5 @@ def convert_semester_readable(semester):
 
 
 def semester_to_number(semester):
-    season_map = {'sp': 0, "su": 1, "fa": 2}
-    return int(semester[2:]) * 10 + season_map.get(semester[:2].lower(), -1)
\ No newline at end of file
+    # stored as Semester.ordinal / Student.grad_ordinal
+    return semester_ordinal(semester)
\ No newline at end of file
@@ -1,8 +1,12 @@
+from urllib.parse import urlencode
+from django.conf import settings
+from django.core.paginator import Paginator
+from django.http import Http404, JsonResponse, StreamingHttpResponse
 from django.shortcuts import render
-from core.models import Semester, Department, Student, Course, Section, Enrollment, PastOrPlanned, Offering
-from django.db.models import Count
-import datetime
-from conflictreport.util_functions import semester_to_number
+from core.models import Semester
+from conflictreport.demand import default_section_size, semester_course_demand
+from conflictreport.export import conflict_export_rows, csv_lines, json_chunks
+from conflictreport.report_cache import semester_report
 
 
 """
@@ -20,130 +24,105 @@ conflict level for each course pair based on:
 """
 
 
-def conflict_report_home(request):
-    today = datetime.date.today()
-    current_year = today.year
-    current_month = today.month
+def report_filters(params):
+    """top_k / min_score / min_overlap from the request; blank, invalid or negative values are ignored."""
+    def parse(name, cast):
+        try:
+            value = cast(params.get(name, ""))
+        except ValueError:
+            return None
+        return value if value >= 0 else None
 
-    if 1 <= current_month <= 4:
-        current_semester_int = (current_year * 10) + 0
-    elif 5 <= current_month <= 7:
-        current_semester_int = (current_year * 10) + 1
-    else:
-        current_semester_int = (current_year * 10) + 2
+    return {
+        'top_k': parse('top_k', int),
+        'min_score': parse('min_score', float),
+        'min_overlap': parse('min_overlap', int)
+    }
 
-    # Get all semesters, convert to int, and filter for future semesters
-    all_semesters = Semester.objects.all().order_by('semester_id')
-    future_semesters = [s for s in all_semesters if semester_to_number(s.semester_id) > current_semester_int]
 
-    # Handle form submission and default semester selection
-    selected_semester_id = request.POST.get('semester', None)
+def selected_or_next_semester(semester_id, semesters):
+    """The requested semester, or the first of the given ones when none was asked for."""
+    if not semester_id:
+        return semesters[0] if semesters else None
+    for semester in semesters:
+        if semester.semester_id == semester_id:
+            return semester
+    return Semester.objects.filter(semester_id=semester_id).first()
 
-    if not selected_semester_id and future_semesters:
-        selected_semester_id = future_semesters[0].semester_id
 
-    selected_semester = Semester.objects.filter(semester_id=selected_semester_id).first()
+def conflict_report_home(request):
+    future = list(Semester.objects.future())
 
+    # Handle form submission (or a pagination link) and default semester selection
+    params = request.POST if request.method == "POST" else request.GET
+    selected_semester = selected_or_next_semester(params.get('semester', None), future)
+
+    filters = report_filters(params)
     conflict_scores = []
+    course_demand = []
 
     if selected_semester:
-        # get all courses in that semester
-        all_courses = Course.objects.filter(
-            section__semester=selected_semester
-        ).distinct()
-        course_list = list(all_courses)
-
-        for i in range(len(course_list)):
-            for j in range(i + 1, len(course_list)):
-                course1 = course_list[i]
-                course2 = course_list[j]
-
-                students1_ids = set(Enrollment.objects.filter(
-                    section__course=course1,
-                    section__semester=selected_semester
-                ).values_list('student__student_id', flat=True))
-
-                students2_ids = set(Enrollment.objects.filter(
-                    section__course=course2,
-                    section__semester=selected_semester
-                ).values_list('student__student_id', flat=True))
-
-                overlapping_students_ids = students1_ids.intersection(students2_ids)
-
-                total_overlapping = len(overlapping_students_ids)
-
-                overlapping_students = Student.objects.filter(student_id__in=list(overlapping_students_ids))
-
-                grad_weight = 0
-                overlap_rarity = 0
-                student_levels = {
-                    "Graduating Seniors": 0,
-                    "Seniors": 0,
-                    "Juniors": 0,
-                    "Sophomores": 0,
-                    "Freshmen": 0
-                }
-                level_map = {
-                    0: "Graduating Seniors",
-                    1: "Seniors",
-                    2: "Seniors",
-                    10: "Juniors",
-                    11: "Juniors",
-                    12: "Juniors",
-                    20: "Sophomores",
-                    21: "Sophomores",
-                    22: "Sophomores",
-                    30: "Freshmen",
-                    31: "Freshmen",
-                    32: "Freshmen"
-                }
-                for student in overlapping_students:
-                    grad_day = student.expected_graduation
-                    grad_distance = (semester_to_number(grad_day.semester_id) -
-                                    semester_to_number(selected_semester.semester_id))
-                    student_levels[level_map[grad_distance]] += 1
-                    if grad_distance != 0:
-                        grad_weight += 2 / grad_distance
-                    else:
-                        grad_weight = 2
-
-                if len(overlapping_students) > 0:
-                    grad_weight /= len(overlapping_students)
-
-                    # course rarity
-                    rarity_map = {'e': 1,
-                    'ef': 1.4, 'es': 1.4,
-                    'fo': 1.6, 'fe': 1.6,
-                    'so': 1.6, 'se': 1.6}
-
-                    offering1 = Offering.objects.filter(course=course1).first().offering_code
-                    offering2 = Offering.objects.filter(course=course2).first().offering_code
-
-                    overlap_rarity = ( rarity_map.get(offering1) + rarity_map.get(offering2) ) / 2
-
-                #overlap_count = len(students1_ids.intersection(students2_ids))
-                student_level_string = ""
-                for level in student_levels:
-                    student_level_string += f"{student_levels[level]} {level}, "
-
-                reason = (f"{total_overlapping} students overlap; {student_level_string[:-2]}; "
-                          f"{round(overlap_rarity - 1)} infrequent courses")
-
-                if round(overlap_rarity - 1) == 1:
-                    reason = reason[:-1]
-
-                if grad_weight > 0:
-                    conflict_scores.append({
-                        'course1': course1,
-                        'course2': course2,
-                        'conflict_score': overlap_rarity * grad_weight,
-                        'reason': reason
-                    })
+        conflict_scores, course_demand = semester_report(selected_semester, filters)
+
+    # only one page of the table is rendered
+    paginator = Paginator(conflict_scores, getattr(settings, "CONFLICT_REPORT_PAGE_SIZE", 50))
+    page = paginator.get_page(params.get('page'))
+    query = {name: value for name, value in filters.items() if value is not None}
+    if selected_semester:
+        query['semester'] = selected_semester.semester_id
+
+    context = {
+        'semesters': future,
+        'selected_semester': selected_semester,
+        'course_conflicts': page,
+        'conflict_count': paginator.count,
+        'course_demand': course_demand,
+        'filters': filters,
+        'page_query': urlencode(query)
+    }
+    return render(request, 'conflictreport/home.html', context)
+
+
+def course_demand_page(request):
+    """Estimated students and sections per course; ?format=json returns the rows as JSON."""
+    future = list(Semester.objects.future())
+    selected_semester = selected_or_next_semester(request.GET.get('semester'), future)
+    demand = semester_course_demand(selected_semester) if selected_semester else []
 
+    if request.GET.get('format') == 'json':
+        return JsonResponse({
+            'semester': selected_semester.semester_id if selected_semester else None,
+            'section_size': default_section_size(),
+            'courses': demand
+        })
 
     context = {
-        'semesters': future_semesters,
+        'semesters': future,
         'selected_semester': selected_semester,
-        'course_conflicts': conflict_scores
+        'course_demand': demand,
+        'section_size': default_section_size()
     }
-    return render(request, 'conflictreport/home.html', context)
\ No newline at end of file
+    return render(request, 'conflictreport/demand.html', context)
+
+
+def export_semester(request):
+    semester = selected_or_next_semester(request.GET.get('semester'), list(Semester.objects.future()))
+    if semester is None:
+        raise Http404("No semester to export.")
+    return semester
+
+
+def export_csv(request):
+    """The report as a streamed CSV download; takes the page's semester and filter parameters."""
+    semester = export_semester(request)
+    rows = conflict_export_rows(semester, **report_filters(request.GET))
+    response = StreamingHttpResponse(csv_lines(rows), content_type="text/csv")
+    response['Content-Disposition'] = f'attachment; filename="conflicts-{semester.semester_id}.csv"'
+    return response
+
+
+def export_json(request):
+    """The report as a streamed JSON document; takes the page's semester and filter parameters."""
+    semester = export_semester(request)
+    rows = conflict_export_rows(semester, **report_filters(request.GET))
+    return StreamingHttpResponse(json_chunks(semester, rows), content_type="application/json")
@@ -0,0 +1,109 @@
+import statistics
+import time
+from pathlib import Path
+
+from django.core.files import File
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from core.models import Semester, Student, PastOrPlanned
+from conflictreport.engine import demand_report, score_pairs
+from conflictreport.matrix import build_matrix, load_pair_rows
+from uploaddata.csv_stream import stream_csv_rows
+from uploaddata.importer import REGISTRAR_FILES, ImportLookups, import_rows
+from uploaddata.synthetic import write_registrar
+
+
+"""
+Benchmark harness behind manage.py benchmark.
+
+benchmark_registrar generates a synthetic registrar of the given size,
+then times, on whatever database is current (the command points it at a
+throwaway test database):
+
+- the CSV import of each file type, as load_registrar runs it
+- the conflict report for every future semester with students in it,
+  building the stored matrix and reading it back
+- the scheduler and progress pages through the test client
+
+View timings are the median of `repeat` requests, one per student.
+"""
+
+
+def elapsed(start):
+    return round(time.perf_counter() - start, 4)
+
+
+def time_imports(directory):
+    seconds = {}
+    lookups = ImportLookups()
+    for import_type, filename in REGISTRAR_FILES:
+        start = time.perf_counter()
+        with open(Path(directory) / filename, "rb") as f:
+            import_rows(import_type, stream_csv_rows(File(f)), lookups=lookups)
+        seconds[import_type] = elapsed(start)
+    return seconds
+
+
+def time_reports(repeat):
+    reports = {}
+    for semester in Semester.objects.future():
+        start = time.perf_counter()
+        pair_rows = build_matrix(semester)
+        score_pairs(pair_rows)
+        demand_report(pair_rows)
+        build = elapsed(start)
+        if not pair_rows:
+            continue
+
+        stored = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            pair_rows = load_pair_rows(semester)
+            score_pairs(pair_rows)
+            demand_report(pair_rows)
+            stored.append(elapsed(start))
+
+        reports[semester.semester_id] = {'pairs': len(pair_rows), 'build_seconds': build,
+                                         'stored_seconds': statistics.median(stored)}
+    return reports
+
+
+def time_views(repeat):
+    planned = PastOrPlanned.objects.order_by("semester__ordinal").select_related("semester").first()
+    semester_id = planned.semester.semester_id if planned else ""
+    students = list(Student.objects.order_by("pk")[:repeat])
+
+    timings = {'scheduler': [], 'progress': []}
+    queries = {}
+    client = Client()
+    for student in students:
+        client.get(reverse("selected_student", args=[student.pk]))
+        for name, url, params in (("scheduler", reverse("schedule"), {"sem": semester_id}),
+                                  ("progress", reverse("progress"), {})):
+            with CaptureQueriesContext(connection) as captured:
+                start = time.perf_counter()
+                client.get(url, params)
+                timings[name].append(time.perf_counter() - start)
+            queries[name] = len(captured)
+
+    return {name: {'median_ms': round(statistics.median(values) * 1000, 2), 'queries': queries[name]}
+            for name, values in timings.items() if values}
+
+
+def benchmark_registrar(students, directory, repeat=3, seed=0):
+    """Generate, load and time a registrar of the given size; expects an empty database."""
+    start = time.perf_counter()
+    rows = write_registrar(directory, students, seed=seed)
+    generate = elapsed(start)
+
+    return {
+        'students': students,
+        'rows': rows,
+        'generate_seconds': generate,
+        'import_seconds': time_imports(directory),
+        'reports': time_reports(repeat),
+        'views': time_views(repeat),
+    }
@@ -0,0 +1,69 @@
+import json
+import platform
+import subprocess
+import tempfile
+import time
+from pathlib import Path
+
+import django
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import setup_databases, setup_test_environment, teardown_databases, \
+    teardown_test_environment
+
+from core.benchmarks import benchmark_registrar
+
+
+def current_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Command(BaseCommand):
+    help = ("Time CSV imports, the conflict report and the planner views on synthetic registrars of "
+            "several sizes, in a throwaway test database, and append the results to a JSON file.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--students", type=int, nargs="+", default=[1000, 10000, 50000])
+        parser.add_argument("--output", default="benchmarks.json",
+                            help="JSON file the run is appended to.")
+        parser.add_argument("--repeat", type=int, default=3)
+        parser.add_argument("--seed", type=int, default=0)
+
+    def handle(self, *args, students, output, repeat, seed, **options):
+        run = {
+            'commit': current_commit(),
+            'timestamp': time.strftime("%Y-%m-%dT%H:%M:%S"),
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'database': connection.vendor,
+            'results': []
+        }
+
+        setup_test_environment()
+        old_config = setup_databases(verbosity=0, interactive=False)
+        try:
+            for count in students:
+                call_command("flush", interactive=False, verbosity=0)
+                with tempfile.TemporaryDirectory() as directory:
+                    result = benchmark_registrar(count, directory, repeat=repeat, seed=seed)
+                run['results'].append(result)
+
+                imports = sum(result['import_seconds'].values())
+                builds = sum(report['build_seconds'] for report in result['reports'].values())
+                self.stdout.write(f"{count:>7} students  import {imports:.2f}s  reports {builds:.2f}s  "
+                                  + "  ".join(f"{name} {view['median_ms']:.1f}ms/{view['queries']}q"
+                                              for name, view in result['views'].items()))
+        finally:
+            teardown_databases(old_config, verbosity=0)
+            teardown_test_environment()
+
+        path = Path(output)
+        runs = json.loads(path.read_text()) if path.exists() else []
+        runs.append(run)
+        path.write_text(json.dumps(runs, indent=2) + "\n")
+        self.stdout.write(self.style.SUCCESS(f"Wrote {path}"))
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_alter_student_options_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='enrollment',
+            index=models.Index(fields=['section', 'student'], name='enrollment_section_student'),
+        ),
+        migrations.AddIndex(
+            model_name='offering',
+            index=models.Index(fields=['course', 'offering_code'], name='offering_course_code'),
+        ),
+        migrations.AddIndex(
+            model_name='pastorplanned',
+            index=models.Index(fields=['semester', 'course', 'student'], name='planned_semester_course'),
+        ),
+        migrations.AddIndex(
+            model_name='section',
+            index=models.Index(fields=['semester', 'course'], name='section_semester_course'),
+        ),
+    ]
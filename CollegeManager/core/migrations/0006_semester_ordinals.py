@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:36
+
+from django.db import migrations, models
+
+
+def fill_ordinals(apps, schema_editor):
+    Semester = apps.get_model('core', 'Semester')
+    Student = apps.get_model('core', 'Student')
+    season_order = {'sp': 0, 'su': 1, 'fa': 2}
+    for semester in Semester.objects.all():
+        semester.ordinal = int(semester.semester_id[2:]) * 10 + season_order.get(semester.semester_id[:2].lower(), -1)
+        semester.save(update_fields=['ordinal'])
+        Student.objects.filter(expected_graduation=semester).update(grad_ordinal=semester.ordinal)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_composite_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='semester',
+            name='ordinal',
+            field=models.IntegerField(db_index=True, default=0),
+        ),
+        migrations.AddField(
+            model_name='student',
+            name='grad_ordinal',
+            field=models.IntegerField(db_index=True, default=0),
+        ),
+        migrations.RunPython(fill_ordinals, migrations.RunPython.noop),
+    ]
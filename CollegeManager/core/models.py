@@ -1,8 +1,74 @@
+import datetime
+import re
+
 from django.db import models
 
 
+SEASON_ORDER = {'sp': 0, 'su': 1, 'fa': 2}
+
+
+SEMESTER_ID_PATTERN = re.compile(r"^(sp|su|fa)(\d{4})$", re.IGNORECASE)
+
+
+class SemesterIdError(ValueError):
+    pass
+
+
+def semester_ordinal(semester_id):
+    """
+    sp2026 -> 20260, su2026 -> 20261, fa2026 -> 20262; sorts and subtracts like the calendar.
+    Raises SemesterIdError (a ValueError) for anything that isn't a season code followed by a four-digit year.
+    """
+    match = SEMESTER_ID_PATTERN.match(str(semester_id))
+    if match is None:
+        raise SemesterIdError(f"{semester_id!r} is not a semester id like sp2026, su2026 or fa2026.")
+    season, year = match.groups()
+    return int(year) * 10 + SEASON_ORDER[season.lower()]
+
+
+def regular_term(ordinal):
+    """Fall/spring term count since year 0; a summer counts with the spring before it."""
+    return ordinal // 10 * 2 + (ordinal % 10 == SEASON_ORDER['fa'])
+
+
+def current_semester_ordinal(today=None):
+    """Ordinal of the semester in session: spring through April, summer through July, then fall."""
+    today = today or datetime.date.today()
+    if 1 <= today.month <= 4:
+        season = SEASON_ORDER['sp']
+    elif 5 <= today.month <= 7:
+        season = SEASON_ORDER['su']
+    else:
+        season = SEASON_ORDER['fa']
+    return today.year * 10 + season
+
+
+class SemesterQuerySet(models.QuerySet):
+    """Calendar filters on the indexed ordinal; today defaults to the current date."""
+
+    def chronological(self):
+        return self.order_by("ordinal")
+
+    def future(self, today=None):
+        return self.filter(ordinal__gt=current_semester_ordinal(today)).chronological()
+
+    def past(self, today=None):
+        return self.filter(ordinal__lt=current_semester_ordinal(today)).chronological()
+
+
 class Semester(models.Model):
     semester_id = models.CharField(max_length=6, unique=True)
+    ordinal = models.IntegerField(default=0, db_index=True)
+
+    objects = SemesterQuerySet.as_manager()
+
+    def save(self, *args, **kwargs):
+        adding = self._state.adding
+        self.ordinal = semester_ordinal(self.semester_id)
+        super().save(*args, **kwargs)
+        if not adding:
+            # keep the graduation ordinal denormalized onto students in step
+            Student.objects.filter(expected_graduation=self).update(grad_ordinal=self.ordinal)
 
     @property
     def name(self):
@@ -38,8 +104,13 @@ class Student(models.Model):
     name = models.CharField(max_length=100)
     email = models.EmailField()
     expected_graduation = models.ForeignKey(Semester, on_delete=models.CASCADE)
+    grad_ordinal = models.IntegerField(default=0, db_index=True)  # expected_graduation.ordinal
     class Meta: ordering=["student_id"]
 
+    def save(self, *args, **kwargs):
+        self.grad_ordinal = self.expected_graduation.ordinal
+        super().save(*args, **kwargs)
+
     def __str__(self):
         return f"{self.name} ({self.student_id})"
 
@@ -62,6 +133,7 @@ class Section(models.Model):
     course = models.ForeignKey(Course, on_delete=models.CASCADE)
     section_num = models.IntegerField()
     semester = models.ForeignKey(Semester, on_delete=models.CASCADE)
+    class Meta: indexes = [models.Index(fields=["semester", "course"], name="section_semester_course")]
 
     def __str__(self):
         return f"{self.course} - {self.semester} (Section {self.section_id})"
@@ -70,7 +142,9 @@ class Section(models.Model):
 class Enrollment(models.Model):
     student = models.ForeignKey(Student, on_delete=models.CASCADE)
     section = models.ForeignKey(Section, on_delete=models.CASCADE)
-    class Meta: unique_together = ("student", "section")
+    class Meta:
+        unique_together = ("student", "section")
+        indexes = [models.Index(fields=["section", "student"], name="enrollment_section_student")]
 
     def __str__(self):
         return f"{self.student} enrolled in {self.section}"
@@ -80,7 +154,10 @@ class PastOrPlanned(models.Model):
     student = models.ForeignKey(Student, on_delete=models.CASCADE)
     semester = models.ForeignKey(Semester, on_delete=models.CASCADE)
     course = models.ForeignKey(Course, on_delete=models.CASCADE)
-    class Meta: unique_together = ("student", "semester", "course")
+    class Meta:
+        # the unique key serves (student, semester) lookups; the index serves per-semester scans
+        unique_together = ("student", "semester", "course")
+        indexes = [models.Index(fields=["semester", "course", "student"], name="planned_semester_course")]
 
     def __str__(self):
         return f"{self.student} past/future enrolled {self.course} in {self.semester}"
@@ -89,7 +166,9 @@ class PastOrPlanned(models.Model):
 class Offering(models.Model):
     offering_code = models.CharField(max_length=2)
     course = models.ForeignKey(Course, on_delete=models.CASCADE)
-    class Meta: unique_together = ("offering_code", "course")
+    class Meta:
+        unique_together = ("offering_code", "course")
+        indexes = [models.Index(fields=["course", "offering_code"], name="offering_course_code")]
 
     def __str__(self):
         return f"{self.course} offered on {self.offering_code}"
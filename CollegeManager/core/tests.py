@@ -1,3 +1,351 @@
-from django.test import TestCase
+import datetime
+import json
+import random
+import tempfile
+from pathlib import Path
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from core.models import (Semester, Department, Student, Course, Section, Enrollment, PastOrPlanned, Offering,
+                         current_semester_ordinal, semester_ordinal)
+from CollegeManager import perf
+from core.benchmarks import benchmark_registrar
+from conflictreport.engine import RARITY_MAP, build_pair_aggregates, semester_incidence
+from conflictreport.matrix import load_pair_rows
+from conflictreport.models import ConflictMember
+from uploaddata.importer import REGISTRAR_FILES
+from uploaddata.synthetic import write_registrar
+
+
+# tables that grow with the registrar data; queries on them must never scan the whole table
+FACT_TABLES = ["core_enrollment", "core_pastorplanned", "core_section", "core_offering",
+               "conflictreport_conflictpair", "conflictreport_conflictmember"]
+
+
+def seed_registrar(student_count, course_count, courses_per_student=4, seed=0):
+    """Bulk-create a small registrar: sections for every course in sp2026, enrollments and plans."""
+    rng = random.Random(seed)
+    semesters = [Semester.objects.create(semester_id=semester_id)
+                 for semester_id in ("fa2025", "sp2026", "fa2026", "sp2027", "fa2027", "sp2028")]
+    current, planned = semesters[1], semesters[3]
+    departments = [Department.objects.create(department_id=code) for code in ("CS", "MATH", "ENG")]
+
+    courses = Course.objects.bulk_create(
+        Course(course_id=f"C{n:03d}", department=departments[n % len(departments)], course_num=100 + n,
+               title=f"Course {n}", min_hours=3, max_hours=3)
+        for n in range(course_count)
+    )
+    Offering.objects.bulk_create(Offering(course=course, offering_code=rng.choice(list(RARITY_MAP)))
+                                 for course in courses)
+    sections = Section.objects.bulk_create(
+        Section(section_id=f"S{n:04d}", department=course.department, course=course, section_num=1,
+                semester=current)
+        for n, course in enumerate(courses)
+    )
+    students = Student.objects.bulk_create(
+        Student(student_id=f"{n:04d}", name=f"Student {n}", email=f"s{n}@college.edu",
+                expected_graduation=grad, grad_ordinal=grad.ordinal)
+        for n, grad in enumerate(rng.choice(semesters[1:]) for _ in range(student_count))
+    )
+
+    Enrollment.objects.bulk_create(Enrollment(student=student, section=section)
+                                   for student in students
+                                   for section in rng.sample(sections, courses_per_student))
+    PastOrPlanned.objects.bulk_create(PastOrPlanned(student=student, semester=planned, course=course)
+                                      for student in students
+                                      for course in rng.sample(courses, courses_per_student))
+    return students
+
+
+def capture_selects(run):
+    """Run the callable and return the (sql, params) of every SELECT it issued."""
+    statements = []
+
+    def record(execute, sql, params, many, context):
+        if sql.lstrip().upper().startswith("SELECT"):
+            statements.append((sql, params))
+        return execute(sql, params, many, context)
+
+    with connection.execute_wrapper(record):
+        run()
+    return statements
+
+
+def full_table_scans(statements):
+    scans = []
+    with connection.cursor() as cursor:
+        for sql, params in statements:
+            cursor.execute("EXPLAIN QUERY PLAN " + sql, params)
+            for row in cursor.fetchall():
+                detail = row[-1]
+                if any(detail.startswith(f"SCAN {table}") for table in FACT_TABLES):
+                    scans.append(f"{detail}\n    in {sql}")
+    return scans
+
+
+class QueryPlanTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.students = seed_registrar(student_count=40, course_count=12)
+
+    def setUp(self):
+        cache.clear()
+
+    def view_requests(self):
+        self.client.post(reverse("conflictreportparams"), {"semester": "sp2026"})
+        self.client.post(reverse("conflictreportparams"), {"semester": "sp2026"})
+        self.client.get(reverse("conflictdemand"), {"semester": "sp2027"})
+        self.client.get(reverse("selected_student", args=[self.students[0].pk]))
+        self.client.get(reverse("schedule"), {"sem": "sp2027"})
+        self.client.get(reverse("progress"))
+
+    def test_report_and_planner_queries_use_indexes(self):
+        statements = capture_selects(self.view_requests)
+        self.assertTrue(statements)
+        self.assertEqual(full_table_scans(statements), [])
+
+
+class SemesterOrdinalTests(TestCase):
+
+    def test_ordinals_follow_the_calendar(self):
+        semesters = [Semester.objects.create(semester_id=semester_id)
+                     for semester_id in ("fa2025", "sp2026", "su2026", "fa2026")]
+        self.assertEqual([semester.ordinal for semester in semesters], [20252, 20260, 20261, 20262])
+        self.assertEqual(list(Semester.objects.order_by("ordinal").values_list("semester_id", flat=True)),
+                         ["fa2025", "sp2026", "su2026", "fa2026"])
+        for semester_id in ("bogus", "wi2026", "sp26", ""):
+            with self.assertRaisesMessage(ValueError, "is not a semester id"):
+                semester_ordinal(semester_id)
+
+    def test_student_grad_ordinal_tracks_expected_graduation(self):
+        spring = Semester.objects.create(semester_id="sp2026")
+        fall = Semester.objects.create(semester_id="fa2026")
+        student = Student.objects.create(student_id="S001", name="S001", email="s1@college.edu",
+                                         expected_graduation=spring)
+        self.assertEqual(student.grad_ordinal, 20260)
+
+        student.expected_graduation = fall
+        student.save()
+        self.assertEqual(Student.objects.get().grad_ordinal, 20262)
+
+        # a matrix that counts the student is rebuilt with the new graduation distance
+        dept = Department.objects.create(department_id="CS")
+        course = Course.objects.create(course_id="C101", department=dept, course_num=101, title="Course 101",
+                                       min_hours=3, max_hours=3)
+        section = Section.objects.create(section_id="X1", department=dept, course=course, section_num=1,
+                                         semester=spring)
+        Enrollment.objects.create(student=student, section=section)
+        load_pair_rows(spring)
+
+        fall.semester_id = "fa2027"
+        fall.save()
+        self.assertEqual(Student.objects.get().grad_ordinal, 20272)
+        self.assertEqual(load_pair_rows(spring), build_pair_aggregates(*semester_incidence(spring), spring.ordinal))
+        self.assertEqual(ConflictMember.objects.get().grad_distance, 12)
+
+        # and so is the renamed semester's own matrix
+        spring.semester_id = "sp2027"
+        spring.save()
+        self.assertEqual(load_pair_rows(spring), build_pair_aggregates(*semester_incidence(spring), spring.ordinal))
+        self.assertEqual(ConflictMember.objects.get().grad_distance, 2)
+
+    def test_future_and_past_are_relative_to_today(self):
+        for semester_id in ("fa2026", "sp2026", "su2026", "sp2027"):
+            Semester.objects.create(semester_id=semester_id)
+        july = datetime.date(2026, 7, 1)
+
+        self.assertEqual([semester.semester_id for semester in Semester.objects.future(july)], ["fa2026", "sp2027"])
+        self.assertEqual([semester.semester_id for semester in Semester.objects.past(july)], ["sp2026"])
+        self.assertEqual(current_semester_ordinal(july), 20261)
+
+
+@override_settings(PERF_MONITOR=True)
+class PerfMiddlewareTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.students = seed_registrar(student_count=10, course_count=6)
+
+    def setUp(self):
+        perf.clear_samples()
+        cache.clear()
+
+    def test_records_samples_per_view(self):
+        self.client.get(reverse("conflictreportparams"), {"semester": "sp2026"})
+        self.client.get(reverse("selected_student", args=[self.students[0].pk]))
+        self.client.get(reverse("schedule"), {"sem": "sp2027"})
+        self.client.get(reverse("progress"))
+        self.client.get(reverse("uploadcsv"))
+
+        samples = {sample['view']: sample for sample in perf.recent_samples()}
+        self.assertLessEqual({"conflictreport.views.conflict_report_home", "studentplan.views.student_scheduler",
+                              "studentplan.views.student_progress", "uploaddata.views.upload_csv"}, samples.keys())
+
+        report = samples["conflictreport.views.conflict_report_home"]
+        self.assertGreater(report['queries'], 0)
+        self.assertLessEqual(len(report['slowest_queries']), perf.SLOW_QUERY_COUNT)
+        self.assertGreater(report['template_ms'], 0)
+        self.assertLessEqual(report['template_ms'], report['ms'])
+
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(reverse("progress"))
+        self.assertEqual(perf.recent_samples()[-1]['queries'], len(queries))
+
+    def test_panel_summarizes_percentiles(self):
+        for _ in range(3):
+            self.client.get(reverse("progress"))
+        self.client.get(reverse("perfpanel"))
+
+        data = self.client.get(reverse("perfpanel"), {"format": "json"}).json()
+        self.assertEqual(data['samples'], 3)
+        self.assertEqual(list(data['views']), ["studentplan.views.student_progress"])
+        self.assertEqual(set(data['views']["studentplan.views.student_progress"]['ms']), {"p50", "p95", "p99", "max"})
+        self.assertContains(self.client.get(reverse("perfpanel")), "student_progress (3 requests)")
+
+    def test_percentile(self):
+        values = list(range(1, 101))
+        self.assertEqual([perf.percentile(values, pct) for pct in (50, 95, 99)], [50, 95, 99])
+        self.assertEqual(perf.percentile([7], 99), 7)
+
+    @override_settings(PERF_MONITOR=False)
+    def test_off_by_default(self):
+        self.client.get(reverse("progress"))
+        self.assertEqual(perf.recent_samples(), [])
+        self.assertEqual(self.client.get(reverse("perfpanel")).status_code, 404)
+
+
+class BenchmarkHarnessTests(TestCase):
+
+    def test_small_run_reports_every_stage(self):
+        with tempfile.TemporaryDirectory() as directory:
+            result = benchmark_registrar(40, directory, repeat=1)
+
+        self.assertEqual(set(result['import_seconds']), {import_type for import_type, _ in REGISTRAR_FILES})
+        self.assertTrue(result['reports'])
+        self.assertTrue(all(report['pairs'] > 0 for report in result['reports'].values()))
+        self.assertEqual(set(result['views']), {"scheduler", "progress"})
+        json.dumps(result)
+
+
+def clear_registrar():
+    # everything else cascades from these
+    Semester.objects.all().delete()
+    Department.objects.all().delete()
+
+
+class ViewQueryCountTests(TestCase):
+    """
+    Every view runs a fixed number of queries however much data there is:
+    each one is measured at two dataset sizes and the counts must be equal
+    and within the bound below. The first conflict report load (building
+    the stored matrix, batched inserts) is excluded; stored reads are not.
+    """
+
+    MAX_QUERIES = {
+        'student_select': 1,
+        'student_scheduler GET': 5,
+        # the insert or delete, then the conflict matrix refresh for the student
+        'student_scheduler POST add': 22,
+        'student_scheduler POST remove': 18,
+        # the same changes answered with JSON, and a batch of them
+        'plan_add': 22,
+        'plan_remove': 17,
+        'plan_apply': 22,
+        'student_progress': 4,
+        'conflict_report_home': 6,
+        'conflict_report_home cached': 1,
+        'graduation_risk_report': 3,
+    }
+
+    # job bookkeeping, lookups, one insert per file and the matrix check
+    UPLOAD_MAX_QUERIES = {
+        'course': 14,
+        'student': 13,
+        'section': 15,
+        'enrollment': 12,
+        'planned': 13,
+        'offering': 10,
+    }
+
+    def setUp(self):
+        cache.clear()
+
+    def count(self, request):
+        with CaptureQueriesContext(connection) as queries:
+            response = request()
+        self.assertLess(response.status_code, 400)
+        return len(queries)
+
+    def view_query_counts(self, students):
+        student = students[0]
+        # a course nobody takes, so the matrix refresh always creates (then deletes) the same kinds of rows
+        course = Course.objects.create(course_id="Z999", department=Department.objects.first(), course_num=999,
+                                       title="New course", min_hours=3, max_hours=3)
+        self.client.get(reverse("selected_student", args=[student.pk]))
+        # on_commit never fires in a TestCase, so the previous dataset's report is still cached
+        cache.clear()
+        self.client.get(reverse("conflictreportparams"), {"semester": "sp2027"})  # builds the stored matrix
+        cache.clear()
+
+        counts = {
+            'student_select': self.count(lambda: self.client.get(reverse("select_student"))),
+            'student_scheduler GET': self.count(lambda: self.client.get(reverse("schedule"), {"sem": "sp2027"})),
+            'student_scheduler POST add': self.count(lambda: self.client.post(reverse("schedule"), {
+                "action": "add", "sem": "sp2027", "course_id": course.course_id})),
+        }
+        planned = PastOrPlanned.objects.get(student=student, course=course)
+        counts['student_scheduler POST remove'] = self.count(lambda: self.client.post(reverse("schedule"), {
+            "action": "remove", "sem": "sp2027", "pp_id": planned.pk}))
+        counts['plan_add'] = self.count(lambda: self.client.post(reverse("plan_add"), {
+            "sem": "sp2027", "course_id": course.course_id}))
+        planned = PastOrPlanned.objects.get(student=student, course=course)
+        counts['plan_remove'] = self.count(lambda: self.client.post(reverse("plan_remove"), {"pp_id": planned.pk}))
+        counts['plan_apply'] = self.count(lambda: self.client.post(reverse("plan_apply"), json.dumps({
+            "add": [{"sem": "sp2027", "course_id": course.course_id}]}), content_type="application/json"))
+        counts['student_progress'] = self.count(lambda: self.client.get(reverse("progress")))
+        counts['conflict_report_home'] = self.count(
+            lambda: self.client.get(reverse("conflictreportparams"), {"semester": "sp2027"}))
+        counts['conflict_report_home cached'] = self.count(
+            lambda: self.client.get(reverse("conflictreportparams"), {"semester": "sp2027"}))
+        counts['graduation_risk_report'] = self.count(lambda: self.client.get(reverse("graduation_risk")))
+        return counts
+
+    def test_views_do_not_grow_with_data(self):
+        # per-student rows grow too, so a query per enrollment or plan shows up
+        small = self.view_query_counts(seed_registrar(student_count=8, course_count=6, courses_per_student=2))
+        clear_registrar()
+        large = self.view_query_counts(seed_registrar(student_count=80, course_count=20, courses_per_student=5,
+                                                      seed=1))
+
+        self.assertEqual(small, large)
+        for view, count in large.items():
+            self.assertLessEqual(count, self.MAX_QUERIES[view], view)
+
+    def upload_query_counts(self, students):
+        counts = {}
+        with tempfile.TemporaryDirectory() as directory:
+            write_registrar(directory, students=students, courses=students // 2)
+            for import_type, filename in REGISTRAR_FILES:
+                with open(Path(directory) / filename, "rb") as f:
+                    csv_file = SimpleUploadedFile(filename, f.read(), content_type="text/csv")
+                counts[import_type] = self.count(lambda: self.client.post(
+                    reverse("uploadcsv"), {"import_type": import_type, "csv_file": csv_file}))
+        return counts
+
+    @override_settings(IMPORT_JOBS_ASYNC=False, IMPORT_STAGING_DIR=tempfile.mkdtemp(), IMPORT_BATCH_SIZE=100000)
+    def test_uploads_do_not_grow_with_rows(self):
+        # 40 students stays within one SQLite INSERT (999 parameters) per file; bulk_create
+        # splits larger files into more statements whatever IMPORT_BATCH_SIZE is
+        small = self.upload_query_counts(10)
+        clear_registrar()
+        large = self.upload_query_counts(40)
+
+        self.assertEqual(small, large)
+        for import_type, count in large.items():
+            self.assertLessEqual(count, self.UPLOAD_MAX_QUERIES[import_type], import_type)
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class StudentplanConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'studentplan'
+
+    def ready(self):
+        from . import signals  # noqa: F401
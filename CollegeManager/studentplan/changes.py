@@ -0,0 +1,150 @@
+from django.db import transaction
+from django.db.models import Sum
+
+from core.models import Semester, Course, Enrollment, PastOrPlanned, semester_ordinal
+from conflictreport.matrix import refresh_changed_students
+from conflictreport.report_cache import dataset_changed
+from conflictreport.signals import refresh_deferred
+from studentplan.plan import COURSE_FIELDS, plan_entry
+
+
+"""
+Adding and removing planned courses without re-rendering the scheduler.
+
+add_planned and remove_planned change one row through the model, so the
+signals refresh the student's stored conflict matrix as before.
+apply_plan_changes takes a whole batch: every course and semester is
+looked up once, removals are one delete() and additions one bulk_create,
+all in one transaction, and the matrix and report cache are refreshed
+once at the end instead of per row.
+
+The scheduler's JSON endpoints answer with the changed entries and
+credit_totals() for the semesters touched, so the page updates just those
+rows.
+"""
+
+
+class PlanChangeError(ValueError):
+    pass
+
+
+def credit_totals(student, semester_ids):
+    """
+    {'terms': {semester id: completed + planned credits}, 'planned_credits':
+    the whole plan's credits} for the given semesters; two queries.
+    """
+    planned = dict(PastOrPlanned.objects
+                   .filter(student=student)
+                   .values("semester__semester_id")
+                   .annotate(hours=Sum("course__min_hours"))
+                   .values_list("semester__semester_id", "hours")
+                   .order_by())
+    completed = dict(Enrollment.objects
+                     .filter(student=student, section__semester__semester_id__in=semester_ids)
+                     .values("section__semester__semester_id")
+                     .annotate(hours=Sum("section__course__min_hours"))
+                     .values_list("section__semester__semester_id", "hours")
+                     .order_by())
+    return {
+        'terms': {semester_id: (completed.get(semester_id) or 0.0) + (planned.get(semester_id) or 0.0)
+                  for semester_id in semester_ids},
+        'planned_credits': sum(hours or 0.0 for hours in planned.values()),
+    }
+
+
+def check_semester_ids(semester_ids):
+    """Raise PlanChangeError unless every id names a semester (sp2026, fa2026, ...)."""
+    bad = []
+    for semester_id in semester_ids:
+        try:
+            semester_ordinal(semester_id)
+        except ValueError:
+            bad.append(str(semester_id))
+    if bad:
+        raise PlanChangeError(f"Not a semester: {', '.join(sorted(set(bad)))}")
+
+
+def planned_entries(queryset):
+    rows = queryset.values_list("pk", "semester__semester_id", *(f"course__{field}" for field in COURSE_FIELDS))
+    return [plan_entry(*row) for row in rows]
+
+
+def add_planned(student, semester_id, course_id):
+    """
+    (entry, created) for the course planned in the semester; raises
+    PlanChangeError for an unknown course or a malformed semester id.
+    """
+    check_semester_ids([semester_id])
+    try:
+        course = Course.objects.get(course_id=course_id)
+    except Course.DoesNotExist:
+        raise PlanChangeError(f"Course {course_id!r} not found.") from None
+    semester, _ = Semester.objects.get_or_create(semester_id=semester_id)
+    planned, created = PastOrPlanned.objects.get_or_create(student=student, semester=semester, course=course)
+    return planned_entries(PastOrPlanned.objects.filter(pk=planned.pk))[0], created
+
+
+def remove_planned(student, pk):
+    """The semester id the removed course was planned for, or None if the student has no such row."""
+    planned = PastOrPlanned.objects.select_related("semester").filter(pk=pk, student=student).first()
+    if planned is None:
+        return None
+    planned.delete()
+    return planned.semester.semester_id
+
+
+def apply_plan_changes(student, add=(), remove=()):
+    """
+    Apply [(semester id, course id)] additions and [PastOrPlanned pk]
+    removals for the student in one transaction. Raises PlanChangeError,
+    changing nothing, when a course doesn't exist or a semester id is
+    malformed. Returns the added entries
+    (including ones that were already planned), the removed pks and the
+    semester ids touched.
+    """
+    add = [tuple(change) for change in add]
+    check_semester_ids({semester_id for semester_id, _ in add})
+    courses = dict(Course.objects
+                   .filter(course_id__in={course_id for _, course_id in add})
+                   .values_list("course_id", "pk"))
+    missing = sorted({course_id for _, course_id in add} - courses.keys())
+    if missing:
+        raise PlanChangeError(f"Courses not found: {', '.join(missing)}")
+
+    with transaction.atomic(), refresh_deferred():
+        semesters = dict(Semester.objects
+                         .filter(semester_id__in={semester_id for semester_id, _ in add})
+                         .values_list("semester_id", "pk"))
+        for semester_id, _ in add:
+            if semester_id not in semesters:
+                semesters[semester_id] = Semester.objects.create(semester_id=semester_id).pk
+
+        removing = PastOrPlanned.objects.filter(pk__in=remove, student=student)
+        removed = list(removing.values_list("pk", "semester_id", "semester__semester_id"))
+        removing.delete()
+
+        PastOrPlanned.objects.bulk_create(
+            [PastOrPlanned(student=student, semester_id=semesters[semester_id], course_id=courses[course_id])
+             for semester_id, course_id in add],
+            ignore_conflicts=True)
+
+        changed = {semester_pk: {student.pk} for semester_pk in
+                   {semesters[semester_id] for semester_id, _ in add} | {semester_pk for _, semester_pk, _ in removed}}
+        if changed:
+            refresh_changed_students(changed)
+            dataset_changed()
+
+    added = []
+    if add:
+        wanted = set(add)
+        candidates = PastOrPlanned.objects.filter(student=student, semester_id__in=semesters.values(),
+                                                  course_id__in=courses.values())
+        added = sorted((entry for entry in planned_entries(candidates)
+                        if (entry['semester_id'], entry['code']) in wanted),
+                       key=lambda entry: (semester_ordinal(entry['semester_id']), entry['sort_key']))
+    semester_ids = {semester_id for semester_id, _ in add} | {semester_id for _, _, semester_id in removed}
+    return {
+        'added': added,
+        'removed': [pk for pk, _, _ in removed],
+        'semester_ids': sorted(semester_ids, key=semester_ordinal),
+    }
@@ -0,0 +1,141 @@
+import heapq
+import re
+import threading
+from bisect import bisect_left
+from collections import Counter
+
+from django.core.cache import cache
+from django.db import transaction
+
+from core.models import Course
+from conflictreport.report_cache import bump_version
+
+
+"""
+In-memory course search for the scheduler's autocomplete.
+
+Every course is loaded once (one query) into two indexes:
+
+- prefix: a sorted list of (key, course) where the keys are the course id
+  (C101), department + number (CS101), the department, the number and
+  each title word; a query token matches every key it starts, found by
+  bisecting, and a course matches when all the query's tokens do
+- trigram: the three-letter pieces of each course's keys, for when the
+  prefixes find too little (typos, the middle of a word)
+
+Matches are ranked exact id/number first, then id/number prefixes, then
+title matches, then trigram matches, each in department and number order.
+
+The index is rebuilt on the next search after a course or department
+changes: the Course/Department signals and the CSV importer bump a
+version in the cache after commit, so every process serving the site
+notices, as with the conflict report cache.
+"""
+
+
+COURSE_INDEX_VERSION_KEY = "studentplan:course-index-version"
+
+# a trigram match has to share at least this share of the query's trigrams
+TRIGRAM_MIN_SHARE = 0.5
+
+
+def normalize(text):
+    return re.sub(r"[^0-9a-z]+", " ", str(text).lower()).split()
+
+
+def trigrams(word):
+    return {word[i:i + 3] for i in range(len(word) - 2)}
+
+
+def courses_changed():
+    """Rebuild the course index once the current transaction commits."""
+    transaction.on_commit(lambda: bump_version(COURSE_INDEX_VERSION_KEY))
+
+
+class CourseIndex:
+
+    def __init__(self, rows):
+        """rows: (course_id, department_id, course_num, title, min_hours), in any order."""
+        self.courses = []
+        self.ids = []
+        prefix_keys = []
+        self.trigrams = {}
+        for position, (course_id, department_id, course_num, title, hours) in enumerate(
+                sorted(rows, key=lambda row: (row[1], row[2], row[0]))):
+            self.courses.append({
+                'code': course_id,
+                'course_id': f"{department_id} {course_num}",
+                'title': title,
+                'hours': hours or 0.0,
+            })
+            ids = {*normalize(course_id), "".join(normalize(f"{department_id}{course_num}"))}
+            words = {*normalize(department_id), str(course_num), *normalize(title)} - ids
+            self.ids.append(ids)
+            prefix_keys.extend((key, position, 0) for key in ids)
+            prefix_keys.extend((key, position, 1) for key in words)
+            for key in ids | words:
+                for trigram in trigrams(key):
+                    self.trigrams.setdefault(trigram, set()).add(position)
+        prefix_keys.sort()
+        self.positions = {course['code']: position for position, course in enumerate(self.courses)}
+        self.keys = [key for key, _, _ in prefix_keys]
+        self.entries = [(position, kind) for _, position, kind in prefix_keys]
+
+    def prefix_matches(self, token):
+        """{course position: best key kind (0 id/number, 1 word)} for the keys that start with token."""
+        matches = {}
+        for i in range(bisect_left(self.keys, token), len(self.keys)):
+            if not self.keys[i].startswith(token):
+                break
+            position, kind = self.entries[i]
+            matches[position] = min(kind, matches.get(position, kind))
+        return matches
+
+    def search(self, query, limit=10, exclude=()):
+        """Up to limit course dicts (code, course_id, title, hours), best first, skipping the codes in exclude."""
+        tokens = normalize(query)
+        if not tokens or limit <= 0:
+            return []
+        exact = "".join(tokens)
+        excluded = {self.positions[code] for code in exclude if code in self.positions}
+
+        ranks = None
+        for token in tokens:
+            matches = self.prefix_matches(token)
+            if ranks is None:
+                ranks = matches
+            else:
+                ranks = {position: max(ranks[position], kind) for position, kind in matches.items()
+                         if position in ranks}
+        ranked = [(0 if exact in self.ids[position] else kind + 1, position)
+                  for position, kind in ranks.items() if position not in excluded]
+
+        wanted = set().union(*(trigrams(token) for token in tokens))
+        if len(ranked) < limit and wanted:
+            shared = Counter(position for trigram in wanted for position in self.trigrams.get(trigram, ()))
+            found = {position for _, position in ranked}
+            ranked.extend((3 + len(wanted) - count, position) for position, count in shared.items()
+                          if count >= len(wanted) * TRIGRAM_MIN_SHARE
+                          and position not in found and position not in excluded)
+
+        return [self.courses[position] for _, position in heapq.nsmallest(limit, ranked)]
+
+
+lock = threading.Lock()
+current = {'version': None, 'index': None}
+
+
+def course_index():
+    """The index for the current courses, rebuilt here if they changed since it was built."""
+    version = cache.get(COURSE_INDEX_VERSION_KEY)
+    with lock:
+        if current['index'] is None or current['version'] != version:
+            rows = Course.objects.values_list("course_id", "department__department_id", "course_num",
+                                              "title", "min_hours")
+            current['index'] = CourseIndex(list(rows))
+            current['version'] = version
+        return current['index']
+
+
+def search_courses(query, limit=10, exclude=()):
+    return course_index().search(query, limit, exclude)
@@ -0,0 +1,41 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.template.loader import render_to_string
+
+from studentplan.plan import plan_summary, selected_students, student_plans
+
+
+class Command(BaseCommand):
+    help = ("Write the plan grids of many students, e.g. everyone graduating in a semester, "
+            "as one printable HTML page or a JSON bundle.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--students", nargs="+", metavar="STUDENT_ID",
+                            help="These students.")
+        parser.add_argument("--graduating", metavar="SEMESTER_ID",
+                            help="Everyone expected to graduate in this semester.")
+        parser.add_argument("--format", choices=["html", "json"], default="html")
+        parser.add_argument("--output", help="Write to this file instead of stdout.")
+
+    def handle(self, *args, students, graduating, format, output, **options):
+        if not (students or graduating):
+            raise CommandError("Pass --students and/or --graduating.")
+
+        selected = selected_students(students, graduating)
+        plans = student_plans(selected)
+        if format == "json":
+            content = json.dumps({'students': [plan_summary(student, plans[student.pk]) for student in selected]},
+                                 indent=2)
+        else:
+            content = render_to_string("studentplan/batch.html", {
+                'graduating': graduating,
+                'students': [(student, plans[student.pk]) for student in selected],
+            })
+
+        if output:
+            with open(output, "w") as f:
+                f.write(content)
+            self.stderr.write(f"Wrote {len(plans)} plans to {output}")
+        else:
+            self.stdout.write(content)
@@ -0,0 +1,154 @@
+from core.models import SEASON_ORDER, Semester, Student, Enrollment, PastOrPlanned
+
+
+"""
+A student's plan: completed and planned courses bucketed by semester.
+
+student_plan reads everything with two queries (enrollments and plans,
+each with its course, department and semester joined in) no matter how
+many courses the student has; student_plans does the same for any number
+of students, grouping the rows by student. Each plan has:
+
+- terms: one entry per semester in calendar order with its completed and
+  planned courses and credit total
+- years: the terms laid out as an academic-year grid (Fall, then Spring
+  and Summer of the following calendar year)
+- flat completed/planned lists and totals for the progress page
+"""
+
+
+COURSE_FIELDS = ["course_id", "department__department_id", "course_num", "title", "min_hours"]
+
+
+def plan_entry(pk, semester_id, course_id, department_id, course_num, title, hours):
+    return {
+        'id': pk,
+        'code': course_id,
+        'course_id': f"{department_id} {course_num}",
+        'title': title,
+        'hours': hours or 0.0,
+        'semester_id': semester_id,
+        'semester': Semester(semester_id=semester_id).name,
+        'sort_key': (department_id, course_num),
+    }
+
+
+def academic_year(ordinal):
+    """Fall 2025, Spring 2026 and Summer 2026 are all in academic year 2025."""
+    year, season = divmod(ordinal, 10)
+    return year if season == SEASON_ORDER['fa'] else year - 1
+
+
+def plan_rows(students):
+    """Enrollment and plan rows for the students, each with everything joined in; two queries."""
+    completed_rows = (Enrollment.objects
+                      .filter(student__in=students)
+                      .values_list("student_id", "section__semester__semester_id", "section__semester__ordinal",
+                                   *(f"section__course__{field}" for field in COURSE_FIELDS)))
+    planned_rows = (PastOrPlanned.objects
+                    .filter(student__in=students)
+                    .values_list("student_id", "pk", "semester__semester_id", "semester__ordinal",
+                                 *(f"course__{field}" for field in COURSE_FIELDS)))
+    return completed_rows, planned_rows
+
+
+def student_plans(students):
+    """
+    {student pk: plan} for many students from the same two queries as one
+    student's plan. Pass a queryset to have it used as a subquery.
+    """
+    completed_rows, planned_rows = plan_rows(students)
+    completed = {student.pk: [] for student in students}
+    planned = {student.pk: [] for student in students}
+    for student_id, *row in completed_rows:
+        completed[student_id].append(row)
+    for student_id, *row in planned_rows:
+        planned[student_id].append(row)
+    return {student.pk: assemble_plan(completed[student.pk], planned[student.pk]) for student in students}
+
+
+def student_plan(student):
+    return student_plans([student])[student.pk]
+
+
+def assemble_plan(completed_rows, planned_rows):
+    terms = {}
+
+    def term_for(semester_id, ordinal):
+        term = terms.get(semester_id)
+        if term is None:
+            term = terms[semester_id] = {
+                'semester_id': semester_id,
+                'name': Semester(semester_id=semester_id).name,
+                'ordinal': ordinal,
+                'completed': [],
+                'planned': [],
+                'credits': 0.0,
+            }
+        return term
+
+    for semester_id, ordinal, *course in completed_rows:
+        entry = plan_entry(None, semester_id, *course)
+        term = term_for(semester_id, ordinal)
+        term['completed'].append(entry)
+        term['credits'] += entry['hours']
+    for pk, semester_id, ordinal, *course in planned_rows:
+        entry = plan_entry(pk, semester_id, *course)
+        term = term_for(semester_id, ordinal)
+        term['planned'].append(entry)
+        term['credits'] += entry['hours']
+
+    ordered = sorted(terms.values(), key=lambda term: term['ordinal'])
+    for term in ordered:
+        term['completed'].sort(key=lambda entry: entry['sort_key'])
+        term['planned'].sort(key=lambda entry: entry['sort_key'])
+
+    seasons = {number: code for code, number in SEASON_ORDER.items()}
+    years = {}
+    for term in ordered:
+        year = academic_year(term['ordinal'])
+        row = years.setdefault(year, {'label': f"{year}-{year + 1}", 'fa': None, 'sp': None, 'su': None})
+        row[seasons[term['ordinal'] % 10]] = term
+
+    completed = [entry for term in ordered for entry in term['completed']]
+    planned = [entry for term in ordered for entry in term['planned']]
+    return {
+        'terms': ordered,
+        'by_semester': terms,
+        'years': [years[year] for year in sorted(years)],
+        'has_summer': any(row['su'] for row in years.values()),
+        'completed': completed,
+        'planned': planned,
+        'completed_credits': sum(entry['hours'] for entry in completed),
+        'planned_credits': sum(entry['hours'] for entry in planned),
+    }
+
+
+def plan_summary(student, plan):
+    """The plan as plain JSON-ready data."""
+    def entries(rows):
+        return [{field: entry[field] for field in ("code", "course_id", "title", "hours")} for entry in rows]
+
+    return {
+        'student_id': student.student_id,
+        'name': student.name,
+        'expected_graduation': student.expected_graduation.semester_id,
+        'completed_credits': plan['completed_credits'],
+        'planned_credits': plan['planned_credits'],
+        'terms': [{
+            'semester_id': term['semester_id'],
+            'credits': term['credits'],
+            'completed': entries(term['completed']),
+            'planned': entries(term['planned']),
+        } for term in plan['terms']],
+    }
+
+
+def selected_students(student_ids=None, graduating=None):
+    """Students by student id and/or everyone expected to graduate in a semester, by name."""
+    students = Student.objects.select_related("expected_graduation").order_by("name", "student_id")
+    if student_ids is not None:
+        students = students.filter(student_id__in=student_ids)
+    if graduating:
+        students = students.filter(expected_graduation__semester_id=graduating)
+    return students
@@ -0,0 +1,136 @@
+from django.conf import settings
+from django.db.models import F, Sum
+
+try:
+    import numpy as np
+except ImportError:  # the columns are computed per student instead
+    np = None
+
+from core.models import SEASON_ORDER, Student, Enrollment, PastOrPlanned, current_semester_ordinal, regular_term
+
+
+"""
+Graduation-risk analysis for every student at once.
+
+Three queries cover the whole student body: the students with their
+expected graduation, completed hours per student (Course.min_hours summed
+over enrollments) and planned hours per student (plans after the current
+semester, up to graduation), both grouped in the database. The per-student
+figures are then array arithmetic over those columns:
+
+- remaining semesters: fall and spring terms after the one in session, up
+  to and including expected graduation (summers are not counted)
+- hours needed: the credit target less completed hours
+- behind: even a full load every remaining semester can't reach the target
+- short: the plan as it stands doesn't reach the target
+
+Enrollments in the semester in session count as completed.
+"""
+
+
+RISK_STATUSES = ["behind", "short", "on track"]
+
+RISK_FIELDS = ["student_id", "name", "expected_graduation", "completed_hours", "planned_hours",
+               "projected_hours", "remaining_semesters", "hours_needed", "hours_per_semester", "status"]
+
+
+def graduation_credits():
+    return getattr(settings, "GRADUATION_CREDITS", 120)
+
+
+def max_semester_credits():
+    return getattr(settings, "MAX_SEMESTER_CREDITS", 18)
+
+
+def hours_by_student(queryset, hours_field):
+    rows = (queryset
+            .values("student")
+            .annotate(hours=Sum(hours_field))
+            .values_list("student", "hours")
+            .order_by())
+    return dict(rows)
+
+
+def risk_columns(pks, grad_ordinals, completed, planned, current, target, max_load):
+    """{field: column} for RISK_FIELDS[3:], one entry per student; status holds RISK_STATUSES indexes."""
+    if np is None:
+        rows = []
+        for pk, grad_ordinal in zip(pks, grad_ordinals):
+            done = completed.get(pk) or 0.0
+            plan = planned.get(pk) or 0.0
+            remaining = max(regular_term(grad_ordinal) - regular_term(current), 0)
+            needed = max(target - done, 0.0)
+            per_semester = needed / remaining if remaining else (None if needed else 0.0)
+            status = 0 if done + remaining * max_load < target else 1 if done + plan < target else 2
+            rows.append((done, plan, done + plan, remaining, needed, per_semester, status))
+        return dict(zip(RISK_FIELDS[3:], map(list, zip(*rows))))
+
+    student_pks = np.fromiter(pks, dtype=np.int64, count=len(pks))
+
+    def column(hours):
+        values = np.zeros(len(student_pks))
+        if hours:
+            keys = np.fromiter(hours.keys(), dtype=np.int64, count=len(hours))
+            values[np.searchsorted(student_pks, keys)] = np.fromiter(
+                (value or 0.0 for value in hours.values()), dtype=float, count=len(hours))
+        return values
+
+    done = column(completed)
+    plan = column(planned)
+    grad = np.fromiter(grad_ordinals, dtype=np.int64, count=len(grad_ordinals))
+    remaining = np.maximum(grad // 10 * 2 + (grad % 10 == SEASON_ORDER['fa']) - regular_term(current), 0)
+    needed = np.maximum(target - done, 0.0)
+    # nothing left to take in no time is fine; anything left is not (None)
+    per_semester = np.divide(needed, remaining, out=np.where(needed > 0, np.nan, 0.0), where=remaining > 0)
+    status = np.where(done + remaining * max_load < target, 0, np.where(done + plan < target, 1, 2))
+    return {
+        'completed_hours': done.tolist(),
+        'planned_hours': plan.tolist(),
+        'projected_hours': (done + plan).tolist(),
+        'remaining_semesters': remaining.tolist(),
+        'hours_needed': needed.tolist(),
+        'hours_per_semester': [None if np.isnan(value) else value for value in per_semester.tolist()],
+        'status': status.tolist(),
+    }
+
+
+def graduation_risk(today=None, target=None, max_load=None):
+    """
+    One dict per student (RISK_FIELDS), most at risk first: behind, then
+    short, then on track, each by hours still needed.
+    """
+    target = graduation_credits() if target is None else target
+    max_load = max_semester_credits() if max_load is None else max_load
+    current = current_semester_ordinal(today)
+
+    students = list(Student.objects
+                    .order_by("pk")
+                    .values_list("pk", "student_id", "name", "expected_graduation__semester_id", "grad_ordinal"))
+    if not students:
+        return []
+    completed = hours_by_student(Enrollment.objects.all(), "section__course__min_hours")
+    planned = hours_by_student(PastOrPlanned.objects.filter(semester__ordinal__gt=current,
+                                                            semester__ordinal__lte=F("student__grad_ordinal")),
+                               "course__min_hours")
+
+    pks, student_ids, names, graduations, grad_ordinals = zip(*students)
+    columns = risk_columns(pks, grad_ordinals, completed, planned, current, target, max_load)
+    columns['status'] = [RISK_STATUSES[status] for status in columns['status']]
+
+    rows = [dict(zip(RISK_FIELDS, values))
+            for values in zip(student_ids, names, graduations, *(columns[field] for field in RISK_FIELDS[3:]))]
+    rows.sort(key=lambda row: (RISK_STATUSES.index(row['status']), -row['hours_needed']))
+    return rows
+
+
+def sorted_risk(rows, sort=None, descending=False):
+    """rows ordered by one of RISK_FIELDS; unknown fields keep the risk order. Blank values sort last."""
+    if sort not in RISK_FIELDS:
+        return rows
+    if sort == "status":
+        def key(row):
+            return RISK_STATUSES.index(row['status'])
+    else:
+        def key(row):
+            return (row[sort] is None) != descending, row[sort] if row[sort] is not None else 0
+    return sorted(rows, key=key, reverse=descending)
@@ -0,0 +1,18 @@
+from django.db.models.signals import post_save, post_delete
+
+from core.models import Department, Course
+from studentplan.course_index import courses_changed
+
+
+"""
+Rebuilds the scheduler's course search index after courses change.
+"""
+
+
+def course_changed(sender, **kwargs):
+    courses_changed()
+
+
+for model in (Department, Course):
+    post_save.connect(course_changed, sender=model, dispatch_uid=f"course-index-save-{model.__name__}")
+    post_delete.connect(course_changed, sender=model, dispatch_uid=f"course-index-delete-{model.__name__}")
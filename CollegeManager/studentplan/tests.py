@@ -1,3 +1,366 @@
+import datetime
+import json
+import tempfile
+from io import StringIO
+from pathlib import Path
+
+from unittest import mock
+
+from django.core.management import call_command
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from core.models import Semester, Department, Student, Course, Section, Enrollment, PastOrPlanned
+from conflictreport.engine import build_pair_aggregates, semester_incidence
+from conflictreport.matrix import build_matrix, load_pair_rows
+from studentplan import course_index, risk
+from studentplan.plan import student_plan
+
+
+class SchedulerTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.semesters = {semester_id: Semester.objects.create(semester_id=semester_id)
+                         for semester_id in ("sp2027", "fa2026", "sp2026", "fa2027")}
+        dept = Department.objects.create(department_id="CS")
+        cls.course = Course.objects.create(course_id="C101", department=dept, course_num=101,
+                                           title="Course 101", min_hours=3, max_hours=3)
+        cls.student = Student.objects.create(student_id="S001", name="S001", email="s1@college.edu",
+                                             expected_graduation=cls.semesters["fa2027"])
+
+    def setUp(self):
+        self.client.get(reverse("selected_student", args=[self.student.pk]))
+
+    def test_semesters_are_listed_in_calendar_order(self):
+        response = self.client.get(reverse("schedule"))
+        self.assertEqual([semester.semester_id for semester in response.context['semesters']],
+                         ["sp2026", "fa2026", "sp2027", "fa2027"])
+
+    def test_planned_courses_are_in_calendar_order(self):
+        for semester_id in ("sp2027", "fa2026"):
+            PastOrPlanned.objects.create(student=self.student, semester=self.semesters[semester_id],
+                                         course=self.course)
+        response = self.client.get(reverse("progress"))
+        self.assertEqual([entry['semester_id'] for entry in response.context['planned']], ["fa2026", "sp2027"])
+
+    def test_plan_grid_buckets_terms_by_academic_year(self):
+        section = Section.objects.create(section_id="X1", department=self.course.department, course=self.course,
+                                         section_num=1, semester=self.semesters["sp2026"])
+        Enrollment.objects.create(student=self.student, section=section)
+        other = Course.objects.create(course_id="C202", department=self.course.department, course_num=202,
+                                      title="Course 202", min_hours=4, max_hours=4)
+        for course in (self.course, other):
+            PastOrPlanned.objects.create(student=self.student, semester=self.semesters["fa2026"], course=course)
+
+        # enrollments and plans, each with everything joined in
+        with self.assertNumQueries(2):
+            plan = student_plan(self.student)
+
+        self.assertEqual([term['semester_id'] for term in plan['terms']], ["sp2026", "fa2026"])
+        self.assertEqual([term['credits'] for term in plan['terms']], [3, 7])
+        self.assertEqual([year['label'] for year in plan['years']], ["2025-2026", "2026-2027"])
+        self.assertEqual(plan['years'][0]['sp']['completed'][0]['course_id'], "CS 101")
+        self.assertIsNone(plan['years'][0]['fa'])
+        self.assertEqual([entry['code'] for entry in plan['years'][1]['fa']['planned']], ["C101", "C202"])
+        self.assertEqual((plan['completed_credits'], plan['planned_credits']), (3, 7))
+
+        response = self.client.get(reverse("progress"))
+        self.assertContains(response, "Plan by Year")
+        self.assertEqual(response.context['classes_completed'], 1)
+        response = self.client.get(reverse("schedule"), {"sem": "fa2026"})
+        self.assertEqual(response.context['selected_term']['credits'], 7)
+
+
+class BatchPlanTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.semesters = {semester_id: Semester.objects.create(semester_id=semester_id)
+                         for semester_id in ("fa2026", "sp2027", "fa2027")}
+        dept = Department.objects.create(department_id="CS")
+        cls.courses = [Course.objects.create(course_id=f"C{n}", department=dept, course_num=n,
+                                             title=f"Course {n}", min_hours=3, max_hours=3)
+                       for n in (101, 102, 103)]
+        cls.students = [Student.objects.create(student_id=f"S00{n}", name=f"S00{n}", email=f"s{n}@college.edu",
+                                               expected_graduation=cls.semesters["sp2027" if n < 4 else "fa2027"])
+                        for n in range(1, 5)]
+        for student in cls.students:
+            for course in cls.courses:
+                PastOrPlanned.objects.create(student=student, semester=cls.semesters["fa2026"], course=course)
+
+    def test_query_count_does_not_grow_with_students(self):
+        # the students, their enrollments and their plans
+        with self.assertNumQueries(3):
+            response = self.client.get(reverse("batch_plans"), {"students": "S001"})
+        self.assertEqual(len(response.context['students']), 1)
+        with self.assertNumQueries(3):
+            response = self.client.get(reverse("batch_plans"), {"graduating": "sp2027"})
+        self.assertEqual([student.student_id for student, _ in response.context['students']],
+                         ["S001", "S002", "S003"])
+        self.assertContains(response, "Graduating sp2027")
+
+    def test_json_bundle(self):
+        response = self.client.get(reverse("batch_plans"), {"students": "S001,S004", "format": "json"})
+        students = response.json()['students']
+        self.assertEqual([student['student_id'] for student in students], ["S001", "S004"])
+        self.assertEqual(students[1]['expected_graduation'], "fa2027")
+        self.assertEqual(students[0]['planned_credits'], 9)
+        self.assertEqual([entry['code'] for entry in students[0]['terms'][0]['planned']], ["C101", "C102", "C103"])
+
+    def test_needs_students_or_semester(self):
+        self.assertEqual(self.client.get(reverse("batch_plans")).status_code, 400)
+
+    def test_command_writes_bundle(self):
+        with tempfile.TemporaryDirectory() as directory:
+            output = Path(directory) / "plans.json"
+            call_command("batch_plans", graduating="fa2027", format="json", output=str(output), stderr=StringIO())
+            students = json.loads(output.read_text())['students']
+            self.assertEqual([student['student_id'] for student in students], ["S004"])
+
+            output = Path(directory) / "plans.html"
+            call_command("batch_plans", students=["S001", "S002"], output=str(output), stderr=StringIO())
+            self.assertEqual(output.read_text().count('class="student-plan"'), 2)
+
+
+class GraduationRiskTests(TestCase):
+    TODAY = datetime.date(2026, 10, 1)  # fa2026 in session
+
+    @classmethod
+    def setUpTestData(cls):
+        semesters = {semester_id: Semester.objects.create(semester_id=semester_id)
+                     for semester_id in ("fa2026", "sp2027", "fa2027", "fa2028")}
+        dept = Department.objects.create(department_id="CS")
+        courses = {hours: Course.objects.create(course_id=f"C{hours}", department=dept, course_num=hours,
+                                                title=f"Course {hours}", min_hours=hours, max_hours=hours)
+                   for hours in (12, 50, 60)}
+
+        def student(n, graduation):
+            return Student.objects.create(student_id=f"S00{n}", name=f"S00{n}", email=f"s{n}@college.edu",
+                                          expected_graduation=semesters[graduation])
+
+        def enroll(student, *hours):
+            for n in hours:
+                section = Section.objects.create(section_id=f"X{student.student_id}{n}", department=dept,
+                                                 course=courses[n], section_num=1, semester=semesters["fa2026"])
+                Enrollment.objects.create(student=student, section=section)
+
+        # nothing done and four semesters left: 72 credits at most
+        student(1, "fa2028")
+        # 60 done, room for the rest but nothing planned
+        enroll(student(2, "fa2028"), 60)
+        # 110 done and 12 planned before graduating; the fa2027 plan comes too late to count
+        on_track = student(3, "sp2027")
+        enroll(on_track, 50, 60)
+        for semester_id in ("sp2027", "fa2027"):
+            PastOrPlanned.objects.create(student=on_track, semester=semesters[semester_id], course=courses[12])
+
+    def assert_risk(self, rows):
+        self.assertEqual([(row['student_id'], row['status']) for row in rows],
+                         [("S001", "behind"), ("S002", "short"), ("S003", "on track")])
+        by_student = {row['student_id']: row for row in rows}
+        self.assertEqual([by_student["S003"][field] for field in ("completed_hours", "planned_hours",
+                                                                  "remaining_semesters", "hours_needed")],
+                         [110, 12, 1, 10])
+        self.assertEqual(by_student["S001"]['hours_per_semester'], 30)
+
+    def test_statuses(self):
+        # students, completed hours, planned hours
+        with self.assertNumQueries(3):
+            rows = risk.graduation_risk(today=self.TODAY)
+        self.assert_risk(rows)
+
+    def test_without_numpy(self):
+        with mock.patch.object(risk, "np", None):
+            self.assert_risk(risk.graduation_risk(today=self.TODAY))
+
+    def test_no_semesters_left(self):
+        rows = risk.graduation_risk(today=datetime.date(2027, 9, 1))
+        self.assertEqual({row['remaining_semesters'] for row in rows}, {0, 2})
+        self.assertIsNone(next(row for row in rows if row['student_id'] == "S003")['hours_per_semester'])
+
+    def test_sorting(self):
+        rows = risk.graduation_risk(today=self.TODAY)
+        self.assertEqual([row['student_id'] for row in risk.sorted_risk(rows, "completed_hours", True)],
+                         ["S003", "S002", "S001"])
+        self.assertIs(risk.sorted_risk(rows, "unknown"), rows)
+
+    def test_report_and_csv(self):
+        response = self.client.get(reverse("graduation_risk"), {"sort": "name", "desc": "1"})
+        self.assertEqual([row['student_id'] for row in response.context['students']], ["S003", "S002", "S001"])
+        self.assertEqual(sum(response.context['counts'].values()), 3)
+
+        response = self.client.get(reverse("graduation_risk_csv"), {"sort": "name"})
+        lines = b"".join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0], ",".join(risk.RISK_FIELDS))
+        self.assertEqual([line.split(",")[0] for line in lines[1:]], ["S001", "S002", "S003"])
+
+
+class CourseSearchTests(TestCase):
+    ROWS = [
+        ("C101", "CS", 101, "Intro to Programming", 3),
+        ("C102", "CS", 102, "Data Structures", 3),
+        ("C356", "CS", 356, "Algorithms", 3),
+        ("M101", "MATH", 101, "Calculus I", 4),
+        ("E101", "ENG", 101, "Composition", 3),
+    ]
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.semester = Semester.objects.create(semester_id="sp2027")
+        departments = {}
+        for course_id, department_id, course_num, title, hours in cls.ROWS:
+            department = departments.get(department_id) or Department.objects.create(department_id=department_id)
+            departments[department_id] = department
+            Course.objects.create(course_id=course_id, department=department, course_num=course_num, title=title,
+                                  min_hours=hours, max_hours=hours)
+        cls.student = Student.objects.create(student_id="S001", name="S001", email="s1@college.edu",
+                                             expected_graduation=cls.semester)
+
+    def setUp(self):
+        # on_commit never fires in a TestCase, so drop whatever index an earlier test built
+        course_index.current['index'] = None
+
+    def search(self, query, **kwargs):
+        return [course['code'] for course in course_index.CourseIndex(self.ROWS).search(query, **kwargs)]
+
+    def test_matches_ids_numbers_and_titles(self):
+        self.assertEqual(self.search("cs 1"), ["C101", "C102"])
+        self.assertEqual(self.search("CS101"), ["C101", "C102"])  # exact first, then close ones
+        self.assertEqual(self.search("101"), ["C101", "E101", "M101"])
+        self.assertEqual(self.search("m101")[0], "M101")
+        self.assertEqual(self.search("data str"), ["C102"])
+        self.assertEqual(self.search("101", limit=1, exclude={"C101"}), ["E101"])
+        self.assertEqual(self.search(""), [])
+
+    def test_trigrams_catch_typos(self):
+        self.assertEqual(self.search("algoritms"), ["C356"])
+        self.assertEqual(self.search("ucture"), ["C102"])
+
+    def test_endpoint_leaves_out_planned_courses(self):
+        self.client.get(reverse("selected_student", args=[self.student.pk]))
+        PastOrPlanned.objects.create(student=self.student, semester=self.semester,
+                                     course=Course.objects.get(course_id="C101"))
+        response = self.client.get(reverse("course_search"), {"q": "cs", "sem": "sp2027"})
+        self.assertEqual(response.json()['courses'],
+                         [{'code': "C102", 'course_id': "CS 102", 'title': "Data Structures", 'hours': 3},
+                          {'code': "C356", 'course_id': "CS 356", 'title': "Algorithms", 'hours': 3}])
+
+    def test_index_is_rebuilt_when_courses_change(self):
+        self.assertEqual(course_index.search_courses("phys"), [])
+        with self.captureOnCommitCallbacks(execute=True):
+            Course.objects.create(course_id="P101", department=Department.objects.get(department_id="CS"),
+                                  course_num=150, title="Physics", min_hours=4, max_hours=4)
+        self.assertEqual([course['code'] for course in course_index.search_courses("phys")], ["P101"])
+
+        # one cache read per search once built
+        with self.assertNumQueries(0):
+            course_index.search_courses("cs")
+
+
+class PlanChangeTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.semester = Semester.objects.create(semester_id="sp2027")
+        dept = Department.objects.create(department_id="CS")
+        cls.courses = [Course.objects.create(course_id=f"C{n}", department=dept, course_num=n, title=f"Course {n}",
+                                             min_hours=3, max_hours=3)
+                       for n in range(101, 107)]
+        cls.student = Student.objects.create(student_id="S001", name="S001", email="s1@college.edu",
+                                             expected_graduation=cls.semester)
+        other = Student.objects.create(student_id="S002", name="S002", email="s2@college.edu",
+                                       expected_graduation=cls.semester)
+        cls.others = PastOrPlanned.objects.create(student=other, semester=cls.semester, course=cls.courses[0])
+
+    def setUp(self):
+        self.client.get(reverse("selected_student", args=[self.student.pk]))
+
+    def apply(self, changes):
+        return self.client.post(reverse("plan_apply"), json.dumps(changes), content_type="application/json")
+
+    def test_add_and_remove_return_the_row_and_credits(self):
+        response = self.client.post(reverse("plan_add"), {"sem": "sp2027", "course_id": "C101"})
+        data = response.json()
+        self.assertTrue(data['created'])
+        self.assertEqual(data['entry']['code'], "C101")
+        self.assertIn("Remove", data['entry']['row'])
+        self.assertEqual((data['terms'], data['planned_credits']), ({"sp2027": 3}, 3))
+        self.assertFalse(self.client.post(reverse("plan_add"), {"sem": "sp2027", "course_id": "C101"})
+                         .json()['created'])
+        self.assertEqual(self.client.post(reverse("plan_add"), {"sem": "sp2027", "course_id": "X999"}).status_code,
+                         404)
+        response = self.client.post(reverse("plan_add"), {"sem": "bogus", "course_id": "C101"})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("bogus", response.json()['error'])
+        response = self.client.post(reverse("schedule"), {"action": "add", "sem": "bogus", "course_id": "C101"})
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(Semester.objects.filter(semester_id="bogus").exists())
+
+        response = self.client.post(reverse("plan_remove"), {"pp_id": data['entry']['id']})
+        self.assertEqual(response.json(), {'removed': data['entry']['id'], 'terms': {"sp2027": 0.0},
+                                           'planned_credits': 0.0})
+        # someone else's plan
+        self.assertEqual(self.client.post(reverse("plan_remove"), {"pp_id": self.others.pk}).status_code, 404)
+        self.assertEqual(self.client.get(reverse("plan_remove")).status_code, 405)
+
+    def test_apply_runs_a_batch_and_refreshes_the_matrix_once(self):
+        build_matrix(self.semester)
+        first = PastOrPlanned.objects.create(student=self.student, semester=self.semester, course=self.courses[1])
+
+        response = self.apply({"add": [{"sem": "sp2027", "course_id": "C101"}, {"sem": "fa2027", "course_id": "C103"}],
+                               "remove": [first.pk, self.others.pk]})
+        data = response.json()
+        self.assertEqual([(entry['semester_id'], entry['code']) for entry in data['added']],
+                         [("sp2027", "C101"), ("fa2027", "C103")])
+        self.assertEqual(data['removed'], [first.pk])
+        self.assertEqual((data['terms'], data['planned_credits']), ({"sp2027": 3, "fa2027": 3}, 6))
+        self.assertTrue(PastOrPlanned.objects.filter(pk=self.others.pk).exists())
+        self.assertEqual(Semester.objects.get(semester_id="fa2027").ordinal, 20272)
+
+        # the stored matrix matches one built from scratch
+        fresh = build_pair_aggregates(*semester_incidence(self.semester), self.semester.ordinal)
+        self.assertEqual(sorted(load_pair_rows(self.semester)),
+                         sorted((c1, c2, overlap, weight, list(levels)) for c1, c2, overlap, weight, levels in fresh))
+
+    def test_apply_queries_do_not_grow_with_changes(self):
+        build_matrix(self.semester)
+
+        def count(course_ids):
+            PastOrPlanned.objects.filter(student=self.student).delete()
+            with CaptureQueriesContext(connection) as queries:
+                self.apply({"add": [{"sem": "sp2027", "course_id": course_id} for course_id in course_ids]})
+            return len(queries)
+
+        self.assertEqual(count(["C101", "C102"]), count(["C101", "C102", "C103", "C104", "C105", "C106"]))
+
+    def test_apply_rejects_unknown_courses_without_changing_anything(self):
+        response = self.apply({"add": [{"sem": "sp2027", "course_id": "C101"}, {"sem": "sp2027", "course_id": "X9"}]})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("X9", response.json()['error'])
+        self.assertFalse(PastOrPlanned.objects.filter(student=self.student).exists())
+        self.assertEqual(self.apply({"add": [{"sem": "sp2027"}]}).status_code, 400)
+        self.assertEqual(self.apply({"add": [{"sem": "bogus", "course_id": "C101"}]}).status_code, 400)
+        self.assertFalse(Semester.objects.filter(semester_id="bogus").exists())
+
+    def test_apply_rejects_malformed_bodies(self):
+        planned = [PastOrPlanned.objects.create(student=self.student, semester=self.semester, course=course)
+                   for course in self.courses[:2]]
+        for changes in ({"remove": "12"},
+                        {"remove": str(planned[0].pk)},
+                        {"remove": [True]},
+                        {"remove": [[planned[0].pk]]},
+                        {"add": {"sem": "sp2027", "course_id": "C103"}},
+                        {"add": [{"sem": ["sp2027"], "course_id": "C103"}]},
+                        {"add": [{"sem": "sp2027", "course_id": {"id": "C103"}}]},
+                        {"add": ["sp2027"]},
+                        [{"sem": "sp2027", "course_id": "C103"}]):
+            response = self.apply(changes)
+            self.assertEqual(response.status_code, 400, changes)
+            self.assertIn("Expected", response.json()['error'])
+        self.assertEqual(set(PastOrPlanned.objects.filter(student=self.student)), set(planned))
 
-# Create your tests here.
+        # planned ids may come as digit strings
+        self.assertEqual(self.apply({"remove": [str(planned[0].pk)]}).json()['removed'], [planned[0].pk])
@@ -4,6 +4,13 @@ from . import views
 urlpatterns = [
     path('', views.student_select, name="select_student"),
     path('schedule/', views.student_scheduler, name="schedule"),
+    path('courses/search/', views.course_search, name="course_search"),
+    path('planned/add/', views.plan_add, name="plan_add"),
+    path('planned/remove/', views.plan_remove, name="plan_remove"),
+    path('planned/apply/', views.plan_apply, name="plan_apply"),
     path('select/<int:pk>/', views.set_student_session, name='selected_student'),
-    path('progress/', views.student_progress, name="progress")
+    path('progress/', views.student_progress, name="progress"),
+    path('batch/', views.batch_plans, name="batch_plans"),
+    path('risk/', views.graduation_risk_report, name="graduation_risk"),
+    path('risk.csv', views.graduation_risk_csv, name="graduation_risk_csv")
 ]
\ No newline at end of file
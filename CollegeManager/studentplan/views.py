@@ -1,11 +1,24 @@
+import json
+from urllib.parse import urlencode
+from django.conf import settings
+from django.core.paginator import Paginator
+from django.http import HttpResponseBadRequest, JsonResponse, StreamingHttpResponse
 from django.shortcuts import render, redirect, get_object_or_404
+from django.template.loader import render_to_string
+from django.views.decorators.http import require_POST
 from django.contrib import messages
-from core.models import Student, Enrollment, PastOrPlanned, Semester, Course
+from core.models import Student, PastOrPlanned, Semester, Course
+from conflictreport.export import csv_lines
+from studentplan.changes import (PlanChangeError, add_planned, apply_plan_changes, check_semester_ids, credit_totals,
+                                 remove_planned)
+from studentplan.course_index import search_courses
+from studentplan.plan import plan_summary, selected_students, student_plan, student_plans
+from studentplan.risk import RISK_FIELDS, RISK_STATUSES, graduation_credits, graduation_risk, sorted_risk
 # Create your views here.
 
 
 def student_select(request):
-    students = Student.objects.all().order_by("name")
+    students = Student.objects.select_related("expected_graduation").order_by("name")
     return render(request, "studentplan/selectstudent.html", {"students": students})
 
 
@@ -44,6 +57,9 @@ def student_scheduler(request):
                     selected_sem = sem.semester_id
                 except Course.DoesNotExist:
                     messages.error(request, "Course not found.")
+                except ValueError as e:
+                    # a malformed semester id
+                    messages.error(request, str(e))
         elif action == "remove":
             pp_id = request.POST.get("pp_id")
             removed = PastOrPlanned.objects.filter(id=pp_id, student=student).delete()[0]
@@ -52,35 +68,139 @@ def student_scheduler(request):
             else:
                 messages.info(request, "Nothing to remove.")
 
-    semesters = Semester.objects.order_by("semester_id")  # for the dropdown
+    semesters = Semester.objects.chronological()  # for the dropdown
 
-    planned_qs = (PastOrPlanned.objects
-                  .filter(student=student)
-                  .select_related("course", "course__department", "semester"))
-    if selected_sem:
-        planned_qs = planned_qs.filter(semester__semester_id=selected_sem)
-
-    planned = planned_qs.order_by("semester__semester_id",
-                                  "course__department__department_id",
-                                  "course__course_num")
+    plan = student_plan(student)
+    planned = plan['planned']
+    selected_term = None
 
-    available_courses = []
     if selected_sem:
-        already = set(planned_qs.values_list("course__course_id", flat=True))
-        available_courses = (Course.objects
-                             .exclude(course_id__in=already)
-                             .select_related("department")
-                             .order_by("department__department_id", "course_num")[:300])
+        selected_term = plan['by_semester'].get(selected_sem)
+        planned = selected_term['planned'] if selected_term else []
 
     context = {
         "student": student,
         "semesters": semesters,
         "selected_sem": selected_sem,
         "planned": planned,
-        "available_courses": available_courses,
+        "selected_term": selected_term,
     }
     return render(request, "studentplan/scheduler.html", context)
 
+def course_search(request):
+    """
+    Autocomplete for the scheduler: ?q= matched against course id, department
+    and number, and title, leaving out the courses the selected student
+    already plans for ?sem=. Returns at most ?limit= (default 10, up to 50).
+    """
+    try:
+        limit = min(max(int(request.GET.get("limit", 10)), 1), 50)
+    except ValueError:
+        limit = 10
+    student_id = request.session.get('student_id')
+    semester_id = request.GET.get("sem")
+    exclude = ()
+    if student_id and semester_id:
+        exclude = set(PastOrPlanned.objects
+                      .filter(student_id=student_id, semester__semester_id=semester_id)
+                      .values_list("course__course_id", flat=True))
+    return JsonResponse({'courses': search_courses(request.GET.get("q", ""), limit, exclude)})
+
+
+def session_student(request):
+    student_id = request.session.get('student_id')
+    return Student.objects.filter(pk=student_id).first() if student_id else None
+
+
+def json_error(message, status=400):
+    return JsonResponse({'error': message}, status=status)
+
+
+def with_row(request, entry):
+    """The entry plus its scheduler table row, for the page to insert as is."""
+    row = render_to_string("studentplan/planned_row.html", {'p': entry, 'selected_sem': entry['semester_id']},
+                           request=request)
+    return dict(entry, row=row)
+
+
+def plan_changed_response(request, student, semester_ids, **data):
+    data.update(credit_totals(student, semester_ids))
+    return JsonResponse(data)
+
+
+@require_POST
+def plan_add(request):
+    """Plan ?course_id for ?sem; returns the new row and the term's credits."""
+    student = session_student(request)
+    if student is None:
+        return json_error("Select a student first.")
+    semester_id = request.POST.get("sem")
+    course_id = request.POST.get("course_id")
+    if not (semester_id and course_id):
+        return json_error("Pick a semester and a course to add.")
+    try:
+        check_semester_ids([semester_id])
+    except PlanChangeError as e:
+        return json_error(str(e))
+    try:
+        entry, created = add_planned(student, semester_id, course_id)
+    except PlanChangeError as e:
+        return json_error(str(e), status=404)
+    return plan_changed_response(request, student, [semester_id], entry=with_row(request, entry), created=created)
+
+
+@require_POST
+def plan_remove(request):
+    """Remove planned course ?pp_id; returns its id and the term's credits."""
+    student = session_student(request)
+    if student is None:
+        return json_error("Select a student first.")
+    pk = request.POST.get("pp_id")
+    semester_id = remove_planned(student, pk) if pk and pk.isdigit() else None
+    if semester_id is None:
+        return json_error("Nothing to remove.", status=404)
+    return plan_changed_response(request, student, [semester_id], removed=int(pk))
+
+
+def parse_plan_changes(body):
+    """([(semester id, course id)], [planned id]) from plan_apply's JSON body; ValueError if it's malformed."""
+    changes = json.loads(body)
+    if not isinstance(changes, dict):
+        raise ValueError("not an object")
+    add, remove = changes.get('add', []), changes.get('remove', [])
+    if not isinstance(add, list) or not isinstance(remove, list):
+        raise ValueError("add and remove must be lists")
+    if not all(isinstance(change, dict) and isinstance(change.get('sem'), str)
+               and isinstance(change.get('course_id'), str) for change in add):
+        raise ValueError("every addition needs a sem and a course_id string")
+    if not all((isinstance(pk, int) and not isinstance(pk, bool)) or (isinstance(pk, str) and pk.isdigit())
+               for pk in remove):
+        raise ValueError("every removal must be a planned id")
+    return [(change['sem'], change['course_id']) for change in add], [int(pk) for pk in remove]
+
+
+@require_POST
+def plan_apply(request):
+    """
+    Apply a batch of changes in one transaction. The body is JSON:
+    {"add": [{"sem": "sp2027", "course_id": "C101"}, ...], "remove": [planned id, ...]}.
+    """
+    student = session_student(request)
+    if student is None:
+        return json_error("Select a student first.")
+    try:
+        add, remove = parse_plan_changes(request.body)
+    except ValueError:
+        return json_error('Expected {"add": [{"sem": ..., "course_id": ...}], "remove": [id, ...]}.')
+    try:
+        result = apply_plan_changes(student, add, remove)
+    except PlanChangeError as e:
+        return json_error(str(e))
+    return plan_changed_response(request, student, result['semester_ids'],
+                                 added=[with_row(request, entry) for entry in result['added']],
+                                 removed=result['removed'])
+
+
 def student_progress(request):
     student_id = request.session.get('student_id')
     if not student_id:
@@ -88,40 +208,94 @@ def student_progress(request):
 
     student = get_object_or_404(Student, pk=student_id)
 
-    # Completed work: count enrollments and sum course hours
-    enrollments = (Enrollment.objects
-                   .filter(student=student)
-                   .select_related("section__course", "section__semester"))
-
-    completed = []
-    total_credits = 0.0
-    for e in enrollments:
-        c = e.section.course
-        sem = e.section.semester.name
-        hours = c.min_hours or 0.0
-        total_credits += hours
-        completed.append({
-            'course_id': f"{c.department.department_id} {c.course_num}",
-            'title': c.title,
-            'hours': hours,
-            'semester': sem
-        })
-
-    # Planned items (optional: across all semesters)
-    planned = (
-        PastOrPlanned.objects
-        .filter(student=student)
-        .select_related("course", "semester")
-        .order_by("semester__semester_id", "course__department__department_id", "course__course_num")
-    )
+    # completed and planned courses by semester, in two queries
+    plan = student_plan(student)
 
     context = {
         'student': student,
-        'completed': completed,
-        'total_credits': total_credits,
-        'planned': planned,
-        'planned_count': planned.count(),
-        'credits_completed': len(completed),
+        'plan': plan,
+        'completed': plan['completed'],
+        'total_credits': plan['completed_credits'],
+        'planned': plan['planned'],
+        'planned_count': len(plan['planned']),
+        'classes_completed': len(plan['completed']),
     }
 
     return render(request, 'studentplan/progress.html', context)
+
+
+def batch_plans(request):
+    """
+    Plan grids for many students on one printable page, or as JSON with
+    ?format=json. Students come from ?students=S001,S002 and/or
+    ?graduating=sp2027.
+    """
+    student_ids = request.GET.get("students")
+    graduating = request.GET.get("graduating")
+    if not (student_ids or graduating):
+        return HttpResponseBadRequest("Pass students=<id,id,...> or graduating=<semester id>.")
+    if student_ids:
+        student_ids = [student_id.strip() for student_id in student_ids.split(",") if student_id.strip()]
+
+    students = selected_students(student_ids, graduating)
+    plans = student_plans(students)
+
+    if request.GET.get("format") == "json":
+        return JsonResponse({'students': [plan_summary(student, plans[student.pk]) for student in students]})
+
+    context = {
+        'graduating': graduating,
+        'students': [(student, plans[student.pk]) for student in students],
+    }
+    return render(request, "studentplan/batch.html", context)
+
+
+def risk_rows(params):
+    """
+    The risk report for ?status=, ?sort= and ?desc= (any non-empty value),
+    the query that reproduces it and the student count per status.
+    """
+    rows = graduation_risk()
+    counts = {status: 0 for status in RISK_STATUSES}
+    for row in rows:
+        counts[row['status']] += 1
+
+    query = {name: params[name] for name in ("status", "sort", "desc") if params.get(name)}
+    if query.get('status') in RISK_STATUSES:
+        rows = [row for row in rows if row['status'] == query['status']]
+    return sorted_risk(rows, query.get('sort'), bool(query.get('desc'))), query, counts
+
+
+def graduation_risk_report(request):
+    """Every student's credit progress against the graduation target, most at risk first; sortable by column."""
+    rows, query, counts = risk_rows(request.GET)
+
+    # each header sorts by its column, and a second click reverses it
+    columns = []
+    for field in RISK_FIELDS:
+        column_query = dict(query, sort=field)
+        column_query.pop('desc', None)
+        if query.get('sort') == field and not query.get('desc'):
+            column_query['desc'] = 1
+        columns.append({'label': field.replace("_", " ").capitalize(), 'query': urlencode(column_query)})
+
+    paginator = Paginator(rows, getattr(settings, "RISK_REPORT_PAGE_SIZE", 100))
+    context = {
+        'students': paginator.get_page(request.GET.get('page')),
+        'student_count': paginator.count,
+        'counts': counts,
+        'columns': columns,
+        'statuses': RISK_STATUSES,
+        'selected_status': query.get('status'),
+        'credit_target': graduation_credits(),
+        'page_query': urlencode(query)
+    }
+    return render(request, "studentplan/risk.html", context)
+
+
+def graduation_risk_csv(request):
+    """The risk report as a streamed CSV download; takes the page's parameters."""
+    rows, _, _ = risk_rows(request.GET)
+    response = StreamingHttpResponse(csv_lines(rows, RISK_FIELDS), content_type="text/csv")
+    response['Content-Disposition'] = 'attachment; filename="graduation-risk.csv"'
+    return response
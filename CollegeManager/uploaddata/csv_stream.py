@@ -0,0 +1,44 @@
+import codecs
+import csv
+
+from django.core.files import File
+
+
+"""
+Streaming CSV reader for uploads.
+
+The upload is read chunk by chunk through an incremental decoder, split into
+lines, stripped of the registrar's quote characters and parsed by
+csv.DictReader one row at a time, so only one chunk and the current batch of
+rows are ever in memory no matter how big the file is.
+"""
+
+
+def decoded_lines(uploaded_file, encoding="utf-8-sig", chunk_size=None):
+    """Yield the file's text lines (with their line endings) as the chunks are decoded."""
+    decoder = codecs.getincrementaldecoder(encoding)()
+    tail = ""
+    for chunk in uploaded_file.chunks(chunk_size):
+        lines = (tail + decoder.decode(chunk)).splitlines(keepends=True)
+        # hold back a partial last line, including a '\r' whose '\n' may be in the next chunk
+        tail = lines.pop() if lines and not lines[-1].endswith("\n") else ""
+        yield from lines
+
+    tail += decoder.decode(b"", final=True)
+    yield from tail.splitlines(keepends=True)
+
+
+def strip_quotes(lines):
+    for line in lines:
+        yield line.replace("'", "")
+
+
+def stream_csv_rows(uploaded_file, chunk_size=None):
+    """csv.DictReader over the uploaded file, parsed lazily."""
+    return csv.DictReader(strip_quotes(decoded_lines(uploaded_file, chunk_size=chunk_size)))
+
+
+def read_csv_file(path):
+    """Parse a CSV file on disk into a list of rows (used by parallel loaders)."""
+    with open(path, "rb") as f:
+        return list(stream_csv_rows(File(f)))
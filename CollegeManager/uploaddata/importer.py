@@ -0,0 +1,304 @@
+from collections import defaultdict
+from itertools import islice
+
+from django.conf import settings
+from django.db import transaction
+
+from core.models import (Semester, Department, Student, Course, Section, Enrollment, PastOrPlanned, Offering,
+                         semester_ordinal)
+from conflictreport.matrix import refresh_changed_students
+from conflictreport.report_cache import dataset_changed
+from studentplan.course_index import courses_changed
+
+
+"""
+Bulk CSV import engine used by upload_csv.
+
+Every foreign key in a file is resolved from in-memory maps that are each
+loaded with one query per model, and rows are written with bulk_create in
+batches inside a single transaction. Each import reports how many rows
+were inserted, updated and skipped (already present or repeated in the
+file).
+"""
+
+
+IMPORT_TYPES = ["course", "section", "student", "enrollment", "offering", "planned"]
+
+# registrar snapshot files, in the order their foreign keys need them
+REGISTRAR_FILES = [("course", "course.csv"), ("student", "student.csv"), ("section", "section.csv"),
+                   ("enrollment", "enrollment.csv"), ("planned", "planned.csv"), ("offering", "offering.csv")]
+
+
+def default_batch_size():
+    return getattr(settings, "IMPORT_BATCH_SIZE", 500)
+
+
+def batched(rows, size):
+    rows = iter(rows)
+    while batch := list(islice(rows, size)):
+        yield batch
+
+
+class ImportLookups:
+    """
+    Natural key -> pk maps for the models an import refers to. Each map is
+    loaded with one query the first time it is needed and kept up to date
+    as rows are written, so it can be shared between several imports.
+    """
+
+    def __init__(self):
+        self.maps = {}
+
+    def get(self, name):
+        if name not in self.maps:
+            self.maps[name] = getattr(self, f"load_{name}")()
+        return self.maps[name]
+
+    def load_departments(self):
+        return dict(Department.objects.values_list("department_id", "pk"))
+
+    def load_semesters(self):
+        return dict(Semester.objects.values_list("semester_id", "pk"))
+
+    def load_students(self):
+        return dict(Student.objects.values_list("student_id", "pk"))
+
+    def load_courses(self):
+        return dict(Course.objects.values_list("course_id", "pk"))
+
+    def load_course_numbers(self):
+        return {(department_id, course_num): pk
+                for department_id, course_num, pk in Course.objects.values_list("department_id", "course_num", "pk")}
+
+    def load_sections(self):
+        return {section_id: (pk, semester_id)
+                for section_id, pk, semester_id in Section.objects.values_list("section_id", "pk", "semester_id")}
+
+    def load_enrollments(self):
+        return set(Enrollment.objects.values_list("student_id", "section_id"))
+
+    def load_planned(self):
+        return set(PastOrPlanned.objects.values_list("student_id", "semester_id", "course_id"))
+
+    def load_offerings(self):
+        return set(Offering.objects.values_list("offering_code", "course_id"))
+
+    def ensure_departments(self, department_ids):
+        """get_or_create for a batch of department codes."""
+        departments = self.get("departments")
+        missing = set(department_ids) - departments.keys()
+        if missing:
+            Department.objects.bulk_create([Department(department_id=code) for code in missing],
+                                           ignore_conflicts=True)
+            departments.update(Department.objects.filter(department_id__in=missing)
+                               .values_list("department_id", "pk"))
+        return departments
+
+    def ensure_semesters(self, semester_ids):
+        """get_or_create for a batch of semester ids."""
+        semesters = self.get("semesters")
+        missing = set(semester_ids) - semesters.keys()
+        if missing:
+            Semester.objects.bulk_create([Semester(semester_id=semester_id, ordinal=semester_ordinal(semester_id))
+                                          for semester_id in missing],
+                                         ignore_conflicts=True)
+            semesters.update(Semester.objects.filter(semester_id__in=missing).values_list("semester_id", "pk"))
+        return semesters
+
+    def require(self, name, key, model, label):
+        try:
+            return self.get(name)[key]
+        except KeyError:
+            raise model.DoesNotExist(f"{model.__name__} with {label} {key!r} does not exist.") from None
+
+
+def import_courses(rows, lookups, result, batch_size):
+    departments = lookups.ensure_departments(row['dept code'] for row in rows)
+    courses = lookups.get("courses")
+
+    # the last row wins when a course id repeats
+    by_id = {}
+    for row in rows:
+        course_id = row['crs id']
+        if course_id in courses or course_id in by_id:
+            result['updated'] += 1
+        else:
+            result['inserted'] += 1
+        by_id[course_id] = Course(
+            course_id=course_id,
+            department_id=departments[row['dept code']],
+            course_num=int(row['crs num']),
+            title=row['title'],
+            min_hours=float(row['min hours']),
+            max_hours=float(row['max hours'])
+        )
+
+    Course.objects.bulk_create(by_id.values(), batch_size=batch_size, update_conflicts=True,
+                               unique_fields=["course_id"],
+                               update_fields=["department", "course_num", "title", "min_hours", "max_hours"])
+
+    saved = Course.objects.filter(course_id__in=by_id).values_list("course_id", "department_id", "course_num", "pk")
+    course_numbers = lookups.get("course_numbers")
+    for course_id, department_id, course_num, pk in saved:
+        courses[course_id] = pk
+        course_numbers[(department_id, course_num)] = pk
+
+
+def import_students(rows, lookups, result, batch_size):
+    semesters = lookups.ensure_semesters(row['exp grad date'] for row in rows)
+    students = lookups.get("students")
+
+    new_students = {}
+    for row in rows:
+        student_id = row['std id']
+        if student_id in students or student_id in new_students:
+            result['skipped'] += 1
+            continue
+        new_students[student_id] = Student(
+            student_id=student_id,
+            name=row['name'],
+            email=row['email'],
+            expected_graduation_id=semesters[row['exp grad date']],
+            grad_ordinal=semester_ordinal(row['exp grad date'])
+        )
+        result['inserted'] += 1
+
+    Student.objects.bulk_create(new_students.values(), batch_size=batch_size, ignore_conflicts=True)
+    students.update(Student.objects.filter(student_id__in=new_students).values_list("student_id", "pk"))
+
+
+def import_sections(rows, lookups, result, batch_size):
+    departments = lookups.ensure_departments(row['dept code'] for row in rows)
+    semesters = lookups.ensure_semesters(row['sem'] for row in rows)
+    sections = lookups.get("sections")
+
+    new_sections = {}
+    for row in rows:
+        department_id = departments[row['dept code']]
+        course_num = int(row['crs num'])
+        course_id = lookups.require("course_numbers", (department_id, course_num), Course,
+                                    "department and number")
+        section_num = int(row['sec num'])
+
+        section_id = row['sec id']
+        if section_id in sections or section_id in new_sections:
+            result['skipped'] += 1
+            continue
+        new_sections[section_id] = Section(
+            section_id=section_id,
+            department_id=department_id,
+            course_id=course_id,
+            section_num=section_num,
+            semester_id=semesters[row['sem']]
+        )
+        result['inserted'] += 1
+
+    Section.objects.bulk_create(new_sections.values(), batch_size=batch_size, ignore_conflicts=True)
+    for section_id, pk, semester_id in (Section.objects.filter(section_id__in=new_sections)
+                                        .values_list("section_id", "pk", "semester_id")):
+        sections[section_id] = (pk, semester_id)
+
+
+def import_enrollments(rows, lookups, result, batch_size):
+    existing = lookups.get("enrollments")
+
+    new_enrollments = []
+    changed = defaultdict(set)
+    for row in rows:
+        student_id = lookups.require("students", row['std id'], Student, "id")
+        section_id, semester_id = lookups.require("sections", row['sec id'], Section, "id")
+
+        if (student_id, section_id) in existing:
+            result['skipped'] += 1
+            continue
+        existing.add((student_id, section_id))
+        new_enrollments.append(Enrollment(student_id=student_id, section_id=section_id))
+        changed[semester_id].add(student_id)
+        result['inserted'] += 1
+
+    Enrollment.objects.bulk_create(new_enrollments, batch_size=batch_size, ignore_conflicts=True)
+    return changed
+
+
+def import_planned(rows, lookups, result, batch_size):
+    semesters = lookups.ensure_semesters(row['sem'] for row in rows)
+    existing = lookups.get("planned")
+
+    new_planned = []
+    changed = defaultdict(set)
+    for row in rows:
+        student_id = lookups.require("students", row['std id'], Student, "id")
+        course_id = lookups.require("courses", row['crs id'], Course, "id")
+        semester_id = semesters[row['sem']]
+
+        key = (student_id, semester_id, course_id)
+        if key in existing:
+            result['skipped'] += 1
+            continue
+        existing.add(key)
+        new_planned.append(PastOrPlanned(student_id=student_id, semester_id=semester_id, course_id=course_id))
+        changed[semester_id].add(student_id)
+        result['inserted'] += 1
+
+    PastOrPlanned.objects.bulk_create(new_planned, batch_size=batch_size, ignore_conflicts=True)
+    return changed
+
+
+def import_offerings(rows, lookups, result, batch_size):
+    existing = lookups.get("offerings")
+
+    new_offerings = []
+    for row in rows:
+        course_id = lookups.require("courses", row['crs id'], Course, "id")
+        offering_code = row['code'].replace("'", "")
+
+        if (offering_code, course_id) in existing:
+            result['skipped'] += 1
+            continue
+        existing.add((offering_code, course_id))
+        new_offerings.append(Offering(course_id=course_id, offering_code=offering_code))
+        result['inserted'] += 1
+
+    Offering.objects.bulk_create(new_offerings, batch_size=batch_size, ignore_conflicts=True)
+
+
+IMPORTERS = {
+    "course": import_courses,
+    "student": import_students,
+    "section": import_sections,
+    "enrollment": import_enrollments,
+    "planned": import_planned,
+    "offering": import_offerings,
+}
+
+
+def import_rows(import_type, rows, batch_size=None, lookups=None, progress=None):
+    """
+    Import csv.DictReader rows of the given type in one transaction.
+    Returns {'inserted': n, 'updated': n, 'skipped': n}; progress, if given,
+    is called with the running totals after every batch.
+    Raises the related model's DoesNotExist when a row refers to a missing
+    student, course or section, and ValueError for bad numbers or semester ids.
+    """
+    importer = IMPORTERS[import_type]
+    batch_size = batch_size or default_batch_size()
+    lookups = lookups or ImportLookups()
+    result = {'inserted': 0, 'updated': 0, 'skipped': 0}
+
+    with transaction.atomic():
+        changed = defaultdict(set)
+        for batch in batched(rows, batch_size):
+            for semester_id, student_ids in (importer(batch, lookups, result, batch_size) or {}).items():
+                changed[semester_id] |= student_ids
+            if progress:
+                progress(result)
+
+        # bulk_create skips the model signals, so refresh stored conflict matrices here
+        if changed:
+            refresh_changed_students(changed, batch_size)
+        if result['inserted'] or result['updated']:
+            dataset_changed()
+            if import_type == "course":
+                courses_changed()
+
+    return result
@@ -0,0 +1,138 @@
+import os
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files import File
+from django.db import close_old_connections, connection, transaction
+from django.utils import timezone
+
+from core.models import Semester, Department, Student, Course, Section, SemesterIdError
+from uploaddata.csv_stream import stream_csv_rows
+from uploaddata.importer import import_rows
+from uploaddata.models import ImportJob
+
+
+"""
+Background CSV import jobs.
+
+upload_csv stages the upload to IMPORT_STAGING_DIR and queues an ImportJob,
+so the request returns as soon as the file is on disk. Jobs run on an
+in-process thread pool (one worker by default, since SQLite allows a single
+writer). The import itself is one transaction, so per-batch progress is
+published through the cache and the job row is written when it finishes.
+
+Set IMPORT_JOBS_ASYNC = False to run jobs inline (used by the tests).
+"""
+
+
+_executor = None
+
+
+def executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=getattr(settings, "IMPORT_JOB_WORKERS", 1),
+                                       thread_name_prefix="import-job")
+    return _executor
+
+
+def staging_dir():
+    path = Path(getattr(settings, "IMPORT_STAGING_DIR", Path(settings.BASE_DIR) / "import_staging"))
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def stage_upload(import_type, uploaded_file):
+    """Copy the upload to the staging directory chunk by chunk and queue a job for it."""
+    path = staging_dir() / f"{uuid.uuid4().hex}.csv"
+    with open(path, "wb") as staged:
+        for chunk in uploaded_file.chunks():
+            staged.write(chunk)
+    return ImportJob.objects.create(import_type=import_type, file_name=uploaded_file.name, staged_path=str(path))
+
+
+def submit(job):
+    if getattr(settings, "IMPORT_JOBS_ASYNC", True):
+        transaction.on_commit(lambda: executor().submit(run_job_in_thread, job.pk))
+    else:
+        run_job(job.pk)
+
+
+def progress_key(job_id):
+    return f"import-job-progress-{job_id}"
+
+
+def job_progress(job):
+    """The job's status for the polling endpoint, including in-flight batch totals."""
+    progress = {
+        'id': job.pk,
+        'import_type': job.import_type,
+        'file_name': job.file_name,
+        'status': job.status,
+        'rows_processed': job.rows_processed,
+        'inserted': job.inserted,
+        'updated': job.updated,
+        'skipped': job.skipped,
+        'error': job.error,
+        'finished': job.is_finished,
+    }
+    if job.status == ImportJob.RUNNING:
+        progress.update(cache.get(progress_key(job.pk)) or {})
+    return progress
+
+
+def describe_import_error(e):
+    if isinstance(e, (Department.DoesNotExist, Course.DoesNotExist, Semester.DoesNotExist)):
+        return f"A related record was not found for one of the sections. Error: {e}"
+    if isinstance(e, (Student.DoesNotExist, Section.DoesNotExist)):
+        return ("A related record was not found. Please ensure all students and sections are imported first. "
+                f"Error: {e}")
+    if isinstance(e, UnicodeDecodeError):
+        return "The file is not valid UTF-8 text."
+    if isinstance(e, SemesterIdError):
+        return f"A semester id had an invalid value. Error: {e}"
+    if isinstance(e, ValueError):
+        # 'crs num' or 'sec num' is not a number
+        return "A numeric field had an invalid value."
+    return f"An error occurred during import: {e}"
+
+
+def run_job(job_id):
+    job = ImportJob.objects.get(pk=job_id)
+    job.status = ImportJob.RUNNING
+    job.save(update_fields=["status"])
+
+    def publish(result):
+        cache.set(progress_key(job_id), {**result, 'rows_processed': sum(result.values())}, timeout=60 * 60)
+
+    try:
+        with open(job.staged_path, "rb") as staged:
+            result = import_rows(job.import_type, stream_csv_rows(File(staged)), progress=publish)
+    except Exception as e:
+        job.status = ImportJob.FAILED
+        job.error = describe_import_error(e)
+    else:
+        job.status = ImportJob.DONE
+        job.inserted, job.updated, job.skipped = result['inserted'], result['updated'], result['skipped']
+        job.rows_processed = sum(result.values())
+    finally:
+        job.finished = timezone.now()
+        job.save()
+        cache.delete(progress_key(job_id))
+        try:
+            os.remove(job.staged_path)
+        except OSError:
+            pass
+
+    return job
+
+
+def run_job_in_thread(job_id):
+    close_old_connections()
+    try:
+        run_job(job_id)
+    finally:
+        connection.close()
@@ -0,0 +1,52 @@
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from django.core.files import File
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from uploaddata.csv_stream import read_csv_file, stream_csv_rows
+from uploaddata.importer import REGISTRAR_FILES, ImportLookups, import_rows
+
+
+class Command(BaseCommand):
+    help = ("Load a registrar snapshot directory (course, student, section, enrollment, planned and "
+            "offering CSVs in the upload_csv formats) in one transaction.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("directory")
+        parser.add_argument("--workers", type=int, default=0,
+                            help="Parse the files in this many worker processes before loading.")
+        parser.add_argument("--batch-size", type=int, default=None)
+
+    def handle(self, *args, directory, workers, batch_size, **options):
+        directory = Path(directory)
+        paths = [(import_type, directory / filename) for import_type, filename in REGISTRAR_FILES]
+        missing = [str(path) for _, path in paths if not path.exists()]
+        if missing:
+            raise CommandError(f"Missing registrar files: {', '.join(missing)}")
+
+        parsed = {}
+        if workers:
+            # the files are independent until they're loaded, so parse them side by side
+            start = time.perf_counter()
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                futures = {import_type: pool.submit(read_csv_file, str(path)) for import_type, path in paths}
+                parsed = {import_type: future.result() for import_type, future in futures.items()}
+            self.stdout.write(f"parsed {len(paths)} files in {time.perf_counter() - start:.2f}s")
+
+        lookups = ImportLookups()
+        total_start = time.perf_counter()
+        with transaction.atomic():
+            for import_type, path in paths:
+                start = time.perf_counter()
+                if import_type in parsed:
+                    result = import_rows(import_type, parsed.pop(import_type), batch_size, lookups)
+                else:
+                    with open(path, "rb") as f:
+                        result = import_rows(import_type, stream_csv_rows(File(f)), batch_size, lookups)
+                self.stdout.write(f"{import_type:<10} {result['inserted']:>8} inserted {result['updated']:>8} updated "
+                                  f"{result['skipped']:>8} skipped  {time.perf_counter() - start:.2f}s")
+
+        self.stdout.write(self.style.SUCCESS(f"Loaded {directory} in {time.perf_counter() - total_start:.2f}s"))
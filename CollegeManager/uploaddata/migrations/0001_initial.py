@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImportJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('import_type', models.CharField(max_length=20)),
+                ('file_name', models.CharField(max_length=255)),
+                ('staged_path', models.CharField(max_length=500)),
+                ('status', models.CharField(choices=[('queued', 'Queued'), ('running', 'Running'), ('done', 'Done'), ('failed', 'Failed')], default='queued', max_length=10)),
+                ('rows_processed', models.IntegerField(default=0)),
+                ('inserted', models.IntegerField(default=0)),
+                ('updated', models.IntegerField(default=0)),
+                ('skipped', models.IntegerField(default=0)),
+                ('error', models.TextField(blank=True)),
+                ('created', models.DateTimeField(auto_now_add=True)),
+                ('finished', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'ordering': ['-created'],
+            },
+        ),
+    ]
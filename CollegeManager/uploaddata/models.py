@@ -1,3 +1,30 @@
 from django.db import models
 
-# Create your models here.
+
+class ImportJob(models.Model):
+    """A CSV upload staged to disk and imported in the background."""
+    QUEUED = "queued"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+    STATUS_CHOICES = [(QUEUED, "Queued"), (RUNNING, "Running"), (DONE, "Done"), (FAILED, "Failed")]
+
+    import_type = models.CharField(max_length=20)
+    file_name = models.CharField(max_length=255)
+    staged_path = models.CharField(max_length=500)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=QUEUED)
+    rows_processed = models.IntegerField(default=0)
+    inserted = models.IntegerField(default=0)
+    updated = models.IntegerField(default=0)
+    skipped = models.IntegerField(default=0)
+    error = models.TextField(blank=True)
+    created = models.DateTimeField(auto_now_add=True)
+    finished = models.DateTimeField(null=True, blank=True)
+    class Meta: ordering = ["-created"]
+
+    @property
+    def is_finished(self):
+        return self.status in (self.DONE, self.FAILED)
+
+    def __str__(self):
+        return f"{self.import_type} import of {self.file_name} ({self.status})"
@@ -0,0 +1,127 @@
+import csv
+import random
+from pathlib import Path
+
+from core.models import SEASON_ORDER, current_semester_ordinal
+from conflictreport.engine import RARITY_MAP
+
+
+"""
+Synthetic registrar snapshots for benchmarks and load tests.
+
+write_registrar writes the six CSVs upload_csv and load_registrar read, in
+the same columns and quoting as sampledata/, at any scale. Ids are padded
+base 36 so they fit the model field lengths up to ~1.6M students. Course
+popularity is skewed (a few courses are in most schedules), students take
+sections in the current and previous semesters and plan courses for the
+following ones, and graduation dates spread over the next four years.
+"""
+
+
+DEPARTMENTS = ["CS", "MATH", "ENG", "BIO", "CHEM", "PHYS", "HIST", "ART"]
+FIRST_NAMES = ["Alex", "Jordan", "Sam", "Taylor", "Morgan", "Casey", "Riley", "Quinn", "Jamie", "Avery"]
+LAST_NAMES = ["Smith", "Jones", "Brown", "Garcia", "Miller", "Davis", "Lopez", "Wilson", "Moore", "Clark"]
+DIGITS = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+
+
+def base36(n, width):
+    digits = []
+    for _ in range(width):
+        n, digit = divmod(n, 36)
+        digits.append(DIGITS[digit])
+    if n:
+        raise ValueError(f"{width} base 36 digits are not enough")
+    return "".join(reversed(digits))
+
+
+def semester_id(ordinal):
+    season = {number: code for code, number in SEASON_ORDER.items()}[ordinal % 10]
+    return f"{season}{ordinal // 10}"
+
+
+def spring_fall_ordinals(year, count):
+    """count spring/fall semester ordinals starting with the given year's spring."""
+    return [(year + n // 2) * 10 + (SEASON_ORDER['fa'] if n % 2 else SEASON_ORDER['sp']) for n in range(count)]
+
+
+def write_rows(path, header, rows):
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f, quoting=csv.QUOTE_NONE, escapechar="\\")
+        writer.writerow(header)
+        for row in rows:
+            writer.writerow([f"'{value}'" for value in row])
+
+
+def weighted_sample(rng, population, cum_weights, k):
+    chosen = set()
+    while len(chosen) < k:
+        chosen.add(rng.choices(population, cum_weights=cum_weights)[0])
+    return chosen
+
+
+def write_registrar(directory, students, courses=None, courses_per_student=4, past_semesters=2,
+                    future_semesters=2, seed=0, today=None):
+    """
+    Write course/student/section/enrollment/planned/offering CSVs for the given
+    number of students into directory and return {file name: data rows}.
+    """
+    rng = random.Random(seed)
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    courses = courses or max(20, students // 25)
+
+    current = current_semester_ordinal(today)
+    ordinals = spring_fall_ordinals(current // 10 - past_semesters, 2 * past_semesters + future_semesters + 12)
+    now = max(i for i, ordinal in enumerate(ordinals) if ordinal <= current)
+    taught = [semester_id(ordinal) for ordinal in ordinals[now - past_semesters:now + 1]]
+    planned = [semester_id(ordinal) for ordinal in ordinals[now + 1:now + 1 + future_semesters]]
+    graduation = [semester_id(ordinal) for ordinal in ordinals[now:now + 9]]
+
+    course_rows = []
+    for n in range(courses):
+        department = DEPARTMENTS[n % len(DEPARTMENTS)]
+        course_num = 100 + n // len(DEPARTMENTS)
+        course_rows.append((f"C{base36(n, 3)}", department, course_num, f"{department} {course_num}", 3, 3))
+    cum_weights = []
+    total = 0.0
+    for rank in range(courses):
+        total += 1 / (rank + 1) ** 0.8
+        cum_weights.append(total)
+
+    section_rows = []
+    sections = {}
+    for semester in taught:
+        for n, (_, department, course_num, *_) in enumerate(course_rows):
+            section_id = f"X{base36(len(section_rows), 5)}"
+            section_rows.append((section_id, department, course_num, 1, semester))
+            sections[(semester, n)] = section_id
+
+    student_rows = []
+    enrollment_rows = []
+    planned_rows = []
+    course_indexes = range(courses)
+    for n in range(students):
+        student_id = base36(n, 4)
+        first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+        student_rows.append((student_id, f"{first} {last}", f"{first}.{last}{n}@college.edu".lower(),
+                             rng.choice(graduation)))
+        for semester in taught:
+            for index in weighted_sample(rng, course_indexes, cum_weights, courses_per_student):
+                enrollment_rows.append((student_id, sections[(semester, index)]))
+        for semester in planned:
+            for index in weighted_sample(rng, course_indexes, cum_weights, courses_per_student):
+                planned_rows.append((course_rows[index][0], student_id, semester))
+
+    offering_rows = [(course_id, rng.choice(list(RARITY_MAP))) for course_id, *_ in course_rows]
+
+    files = {
+        "course.csv": (["crs id", "dept code", "crs num", "title", "min hours", "max hours"], course_rows),
+        "student.csv": (["std id", "name", "email", "exp grad date"], student_rows),
+        "section.csv": (["sec id", "dept code", "crs num", "sec num", "sem"], section_rows),
+        "enrollment.csv": (["std id", "sec id"], enrollment_rows),
+        "planned.csv": (["crs id", "std id", "sem"], planned_rows),
+        "offering.csv": (["crs id", "code"], offering_rows),
+    }
+    for filename, (header, rows) in files.items():
+        write_rows(directory / filename, header, rows)
+    return {filename: len(rows) for filename, (_, rows) in files.items()}
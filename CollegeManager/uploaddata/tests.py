@@ -1,3 +1,188 @@
-from django.test import TestCase
+import csv
+import tempfile
+from io import StringIO
+from pathlib import Path
 
-# Create your tests here.
+from django.conf import settings
+from django.core.management import call_command
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from core.models import Semester, Student, Course, Section, Enrollment, PastOrPlanned, Offering
+from conflictreport.engine import build_pair_aggregates, semester_incidence
+from conflictreport.matrix import build_matrix, load_pair_rows
+from uploaddata.csv_stream import decoded_lines, stream_csv_rows
+from uploaddata.importer import REGISTRAR_FILES, import_rows
+from uploaddata.models import ImportJob
+from uploaddata.synthetic import base36, write_registrar
+
+
+SAMPLE_DIR = Path(settings.BASE_DIR) / "sampledata"
+
+SAMPLE_FILES = REGISTRAR_FILES
+
+
+def upload(client, import_type, filename, content=None):
+    if content is None:
+        content = (SAMPLE_DIR / filename).read_bytes()
+    csv_file = SimpleUploadedFile(filename, content, content_type="text/csv")
+    return client.post(reverse("uploadcsv"), {"import_type": import_type, "csv_file": csv_file})
+
+
+def sample_rows_in(directory, filename):
+    with open(Path(directory) / filename, newline="") as f:
+        return list(csv.DictReader(line.replace("'", "") for line in f))
+
+
+def sample_rows(filename):
+    return sample_rows_in(SAMPLE_DIR, filename)
+
+
+@override_settings(IMPORT_JOBS_ASYNC=False, IMPORT_STAGING_DIR=tempfile.mkdtemp())
+class UploadCsvTests(TestCase):
+
+    def test_sample_files_import_in_order(self):
+        for import_type, filename in SAMPLE_FILES:
+            response = upload(self.client, import_type, filename)
+            self.assertEqual(response.status_code, 200, response.content)
+
+        self.assertEqual(Course.objects.count(), len(sample_rows("course.csv")))
+        self.assertEqual(Student.objects.count(), len(sample_rows("student.csv")))
+        self.assertEqual(Section.objects.count(), len(sample_rows("section.csv")))
+        self.assertEqual(Enrollment.objects.count(),
+                         len({(row['std id'], row['sec id']) for row in sample_rows("enrollment.csv")}))
+        self.assertEqual(PastOrPlanned.objects.count(),
+                         len({(row['std id'], row['sem'], row['crs id']) for row in sample_rows("planned.csv")}))
+        self.assertEqual(Offering.objects.count(), len(sample_rows("offering.csv")))
+
+        self.assertFalse(Semester.objects.filter(ordinal=0).exists())
+        for student in Student.objects.select_related("expected_graduation"):
+            self.assertEqual(student.grad_ordinal, student.expected_graduation.ordinal)
+
+    def test_reimport_reports_skipped_and_updated_rows(self):
+        for import_type, filename in SAMPLE_FILES[:2]:
+            upload(self.client, import_type, filename)
+
+        courses = import_rows("course", sample_rows("course.csv"))
+        self.assertEqual(courses, {'inserted': 0, 'updated': len(sample_rows("course.csv")), 'skipped': 0})
+
+        students = import_rows("student", sample_rows("student.csv"))
+        self.assertEqual(students, {'inserted': 0, 'updated': 0, 'skipped': len(sample_rows("student.csv"))})
+
+    def test_missing_student_rolls_back_the_whole_file(self):
+        for import_type, filename in SAMPLE_FILES[:3]:
+            upload(self.client, import_type, filename)
+
+        content = b"std id,sec id\n'S001','SEC001'\n'S999','SEC001'\n"
+        response = upload(self.client, "enrollment", "enrollment.csv", content)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn(b"S999", response.content)
+        self.assertFalse(Enrollment.objects.exists())
+
+    def test_query_count_does_not_grow_with_rows(self):
+        for import_type, filename in SAMPLE_FILES[:3]:
+            upload(self.client, import_type, filename)
+        rows = sample_rows("enrollment.csv")
+
+        # savepoint, lookups for students, sections and existing enrollments,
+        # one insert, the built-matrix check and the release
+        with self.assertNumQueries(7):
+            import_rows("enrollment", rows[:10], batch_size=1000)
+        with self.assertNumQueries(7):
+            import_rows("enrollment", rows[10:], batch_size=1000)
+
+    def test_bulk_enrollments_refresh_built_conflict_matrix(self):
+        for import_type, filename in SAMPLE_FILES[:3]:
+            upload(self.client, import_type, filename)
+        semester = Semester.objects.get(semester_id="sp2026")
+        build_matrix(semester)
+
+        import_rows("enrollment", sample_rows("enrollment.csv"))
+
+        stored = load_pair_rows(semester)
+        fresh = build_pair_aggregates(*semester_incidence(semester), semester.ordinal)
+        self.assertEqual([row[:3] for row in stored], [row[:3] for row in fresh])
+
+
+@override_settings(IMPORT_JOBS_ASYNC=False, IMPORT_STAGING_DIR=tempfile.mkdtemp())
+class ImportJobTests(TestCase):
+
+    def test_upload_runs_a_job_and_reports_its_status(self):
+        upload(self.client, "course", "course.csv")
+
+        job = ImportJob.objects.get()
+        self.assertEqual(job.status, ImportJob.DONE)
+        self.assertEqual(job.rows_processed, len(sample_rows("course.csv")))
+        self.assertFalse(Path(job.staged_path).exists())
+
+        status = self.client.get(reverse("importjobstatus", args=[job.pk])).json()
+        self.assertEqual(status['status'], "done")
+        self.assertEqual(status['inserted'], job.inserted)
+        self.assertTrue(status['finished'])
+
+    def test_failed_job_keeps_the_error(self):
+        upload(self.client, "enrollment", "enrollment.csv")
+
+        job = ImportJob.objects.get()
+        self.assertEqual(job.status, ImportJob.FAILED)
+        self.assertIn("Please ensure all students and sections are imported first", job.error)
+
+    def test_bad_semester_id_is_named_in_the_error(self):
+        upload(self.client, "student", "student.csv",
+               b"std id,name,email,exp grad date\n'S001','Mike Jones','mike.jones@college.edu','spring27'\n")
+
+        job = ImportJob.objects.get()
+        self.assertEqual(job.status, ImportJob.FAILED)
+        self.assertEqual(job.error, "A semester id had an invalid value. Error: 'spring27' is not a semester id "
+                                    "like sp2026, su2026 or fa2026.")
+        self.assertFalse(Student.objects.exists())
+
+
+class LoadRegistrarTests(TestCase):
+
+    def test_loads_sample_directory(self):
+        for workers in (0, 2):
+            out = StringIO()
+            call_command("load_registrar", SAMPLE_DIR, workers=workers, stdout=out)
+            self.assertIn("Loaded", out.getvalue())
+
+        self.assertEqual(Course.objects.count(), len(sample_rows("course.csv")))
+        self.assertEqual(Offering.objects.count(), len(sample_rows("offering.csv")))
+        # the second run found everything already loaded
+        self.assertRegex(out.getvalue(), r"enrollment\s+0 inserted")
+
+
+class SyntheticRegistrarTests(TestCase):
+
+    def test_generated_files_load_with_load_registrar(self):
+        with tempfile.TemporaryDirectory() as directory:
+            rows = write_registrar(directory, students=60, courses=12, seed=1)
+            self.assertEqual(sample_rows_in(directory, "enrollment.csv")[0].keys(), {"std id", "sec id"})
+            call_command("load_registrar", directory, stdout=StringIO())
+
+        self.assertEqual(Student.objects.count(), rows["student.csv"])
+        self.assertEqual(Course.objects.count(), 12)
+        self.assertEqual(Enrollment.objects.count(), rows["enrollment.csv"])
+        self.assertEqual(PastOrPlanned.objects.count(), rows["planned.csv"])
+        self.assertTrue(Semester.objects.future().filter(pastorplanned__isnull=False).exists())
+
+    def test_ids_fit_the_model_fields(self):
+        self.assertEqual(base36(50000, 4), "12KW")
+        with self.assertRaises(ValueError):
+            base36(36 ** 4, 4)
+
+
+class CsvStreamTests(SimpleTestCase):
+
+    def test_lines_survive_chunk_boundaries(self):
+        content = "crs id,title\r\n'C001','Café'\r\n'C002','Naïve'".encode("utf-8")
+        for chunk_size in (1, 2, 3, 7, 64):
+            lines = list(decoded_lines(SimpleUploadedFile("t.csv", content), chunk_size=chunk_size))
+            self.assertEqual(lines, ["crs id,title\r\n", "'C001','Café'\r\n", "'C002','Naïve'"])
+
+    def test_rows_are_parsed_lazily_without_quotes(self):
+        content = "\ufeffstd id,sec id\n'S001','SEC001'\n'S002','SEC002'\n".encode("utf-8")
+        rows = stream_csv_rows(SimpleUploadedFile("t.csv", content), chunk_size=4)
+        self.assertEqual(next(rows), {'std id': 'S001', 'sec id': 'SEC001'})
+        self.assertEqual(list(rows), [{'std id': 'S002', 'sec id': 'SEC002'}])
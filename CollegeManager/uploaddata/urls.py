@@ -3,4 +3,5 @@ from . import views
 
 urlpatterns = [
     path('', views.upload_csv, name="uploadcsv"),
-]
\ No newline at end of file
+    path('jobs/<int:pk>/', views.import_job_status, name="importjobstatus"),
+]